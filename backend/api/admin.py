@@ -1,5 +1,7 @@
-from django.contrib import admin
-from .models import Product, Customer, Orders, OrderItem
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
+from .inventory import InsufficientStock
+from .models import Product, Customer, Orders, OrderItem, OutboundEmail
 from django.contrib.auth.models import User
 
 class CustomerAdmin(admin.ModelAdmin):
@@ -37,6 +39,21 @@ class OrdersAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return False  # Prevent deletion of orders in admin
 
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        # Reopening a cancelled order takes its stock again. Without enough,
+        # the save is rolled back and the admin is sent back to the order.
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except InsufficientStock as e:
+            self.message_user(request, f"The order was not changed: {e}.", messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'subject', 'status', 'attempts', 'created_at', 'sent_at', 'next_attempt_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
 admin.site.register(Product)
 admin.site.register(Customer, CustomerAdmin)
 admin.site.register(Orders, OrdersAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
\ No newline at end of file
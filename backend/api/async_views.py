@@ -0,0 +1,96 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated
+
+from . import projections
+from .authentication import CachedJWTAuthentication
+from .cache import catalog_cache
+from .models import OrderItem, Orders, Product
+from .renderers import FastJSONRenderer
+from .serializers import OrderSerializer, ProductSerializer
+from .views import ProductCatalog, cart_data, cart_lines, cart_with_totals, query_flag
+
+# Async versions of the read-heavy endpoints, routed in place of the DRF views
+# when ASYNC_VIEWS is on. They return the same JSON through Django's async ORM,
+# so one ASGI worker can hold many slow requests open at once.
+
+
+def json_response(data, status=status.HTTP_200_OK, headers=None):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status, headers=headers)
+
+
+def jwt_required(view):
+    """
+    Async counterpart of IsAuthenticated with the default JWT authentication:
+    sets request.user or answers 401 like DRF would.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        authenticator = CachedJWTAuthentication()
+        challenge = authenticator.authenticate_header(request)
+        try:
+            result = await sync_to_async(authenticator.authenticate)(request)
+        except APIException as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return json_response(detail, status=e.status_code, headers={'WWW-Authenticate': challenge})
+        if result is None:
+            return json_response(
+                {'detail': NotAuthenticated.default_detail}, status=status.HTTP_401_UNAUTHORIZED,
+                headers={'WWW-Authenticate': challenge},
+            )
+        request.user = result[0]
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@require_safe
+async def get_products(request):
+    if not settings.PRODUCTS_UNPAGINATED_COMPAT:
+        # Cursor pagination and filtering are DRF's, which is sync
+        return await sync_to_async(ProductCatalog.as_view())(request)
+
+    async def build():
+        if settings.FAST_RENDERING:
+            return projections.products([row async for row in Product.objects.values(*projections.PRODUCT_FIELDS)])
+        return ProductSerializer([product async for product in Product.objects.all()], many=True).data
+
+    return await catalog_cache.arespond(request, build)
+
+
+@require_safe
+async def get_single_product(request, pk):
+    async def build():
+        return ProductSerializer(await Product.objects.aget(id=pk)).data
+
+    try:
+        return await catalog_cache.arespond(request, build)
+    except Product.DoesNotExist:
+        return json_response({"detail": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
+
+
+@require_safe
+@jwt_required
+async def view_cart(request):
+    compact = query_flag(request, 'compact')
+    cart = await cart_with_totals(request.user).afirst()
+    if cart is None:
+        return json_response({"detail": "Cart does not exist"}, status=status.HTTP_404_NOT_FOUND)
+    cart_items = [item async for item in cart_lines(cart, compact)]
+    return json_response(cart_data(cart, cart_items, compact))
+
+
+@require_safe
+@jwt_required
+async def user_orders(request):
+    if settings.FAST_RENDERING:
+        orders = [row async for row in projections.order_rows(Orders.objects.filter(user=request.user))]
+        items = OrderItem.objects.filter(order__user=request.user)
+        items = [row async for row in projections.order_item_rows(items)]
+        return json_response(projections.orders(orders, items))
+    orders = OrderSerializer.setup_eager_loading(Orders.objects.filter(user=request.user))
+    return json_response(OrderSerializer([order async for order in orders], many=True).data)
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+
+def user_cache():
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+def version_key(user_id):
+    return f'auth:user-version:{user_id}'
+
+
+def new_version():
+    # Random rather than a counter, so a version evicted from the cache can
+    # never come back as an older value and resurrect a stale entry
+    return uuid.uuid4().hex
+
+
+def get_user_version(user_id):
+    cache = user_cache()
+    version = cache.get(version_key(user_id))
+    if version is None:
+        cache.add(version_key(user_id), new_version(), None)
+        version = cache.get(version_key(user_id))
+    return version
+
+
+def invalidate_user(user_id):
+    """
+    Drop the cached copy of a user, e.g. after a change to their password,
+    is_active or is_staff. Entries are keyed by version, so a request that
+    loaded the user before this call cannot store a stale copy afterwards.
+    """
+    user_cache().set(version_key(user_id), new_version(), None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that serves the token's user from the cache for
+    AUTH_USER_CACHE_TIMEOUT seconds instead of loading the Customer row on
+    every request.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        cache = user_cache()
+        key = f'auth:user:{user_id}:{get_user_version(user_id)}'
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        elif not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+
+class LastLoginBuffer:
+    """
+    Collects last_login times in memory and writes them with one UPDATE per
+    batch from a background thread, every LAST_LOGIN_FLUSH_INTERVAL seconds,
+    instead of an UPDATE inside every login request. Times still pending
+    when a worker exits are lost; last_login is advisory.
+    """
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def record(self, user_id, when=None):
+        with self._lock:
+            self._pending[user_id] = when or timezone.now()
+        if settings.LAST_LOGIN_FLUSH_INTERVAL <= 0:
+            self.flush()
+        else:
+            self._start()
+
+    def reset(self):
+        """Drop pending times without writing them, e.g. between tests."""
+        with self._lock:
+            self._pending = {}
+
+    def flush(self):
+        """Write every pending last_login. Returns the number of users updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        items = list(pending.items())
+        try:
+            for start in range(0, len(items), 500):
+                chunk = items[start:start + 500]
+                get_user_model().objects.filter(id__in=[user_id for user_id, _ in chunk]).update(
+                    last_login=Case(
+                        *[When(id=user_id, then=Value(when)) for user_id, when in chunk],
+                        output_field=DateTimeField(),
+                    )
+                )
+        except Exception:
+            # Keep the times for the next flush unless a newer login replaced them
+            with self._lock:
+                for user_id, when in items:
+                    self._pending.setdefault(user_id, when)
+            raise
+        for user_id, _ in items:
+            invalidate_user(user_id)
+        return len(items)
+
+    def _start(self):
+        # Checked against the pid so each forked gunicorn worker gets its own thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='last-login-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.LAST_LOGIN_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not write last_login times")
+            finally:
+                connection.close()
+
+
+last_login_buffer = LastLoginBuffer()
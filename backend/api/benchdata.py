@@ -0,0 +1,132 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import catalog_cache
+from .models import Customer, OrderItem, Orders, Product
+from .search import get_search_backend
+from .stats import rebuild_rollups
+
+# Every generated row is named with this prefix so it can be found and removed again
+PREFIX = 'bench'
+PASSWORD = 'bench-password'
+
+CITIES = [
+    ('Mumbai', 'Maharashtra'), ('Pune', 'Maharashtra'), ('Bengaluru', 'Karnataka'), ('Mysuru', 'Karnataka'),
+    ('Chennai', 'Tamil Nadu'), ('Hyderabad', 'Telangana'), ('Kolkata', 'West Bengal'), ('Delhi', 'Delhi'),
+    ('Jaipur', 'Rajasthan'), ('Ahmedabad', 'Gujarat'), ('Kochi', 'Kerala'), ('Lucknow', 'Uttar Pradesh'),
+]
+# (name words, price range) per category
+CATALOG = {
+    'macbook': (['MacBook', 'Air', 'Pro', 'M3', '13-inch', '15-inch'], (90000, 250000)),
+    'iphone': (['iPhone', '15', 'Pro', 'Max', 'Plus', 'mini'], (50000, 160000)),
+    'ipad': (['iPad', 'Air', 'Pro', 'mini', 'Wi-Fi', 'Cellular'], (30000, 120000)),
+    'watch': (['Watch', 'Series', 'Ultra', 'SE', 'GPS', 'Titanium'], (25000, 90000)),
+    'airpods': (['AirPods', 'Pro', 'Max', 'case', 'USB-C', 'wireless'], (10000, 60000)),
+    'tvandhome': (['Apple', 'TV', '4K', 'HomePod', 'mini', 'remote'], (10000, 35000)),
+    'others': (['MagSafe', 'charger', 'cable', 'adapter', 'Pencil', 'keyboard'], (1000, 15000)),
+}
+BATCH_SIZE = 2000
+
+
+def bench_customers():
+    return Customer.objects.filter(username__startswith=f'{PREFIX}-')
+
+
+def bench_products():
+    return Product.objects.filter(name__startswith=f'{PREFIX.title()} ')
+
+
+def generate(customers, products, orders, seed=0, stdout=None):
+    """
+    Create a reproducible storefront: `customers` shoppers plus one staff
+    user, `products` products spread over Product.CATEGORY_CHOICES and
+    `orders` historic orders from the past year. The same seed always
+    gives the same data.
+    """
+    rng = random.Random(seed)
+    log = stdout.write if stdout else (lambda message: None)
+    # One hash for everyone; hashing per user would dominate the run
+    password = make_password(PASSWORD)
+
+    with transaction.atomic():
+        staff = Customer.objects.create(
+            username=f'{PREFIX}-admin', email=f'{PREFIX}-admin@example.com', password=password,
+            customer_name='Bench Admin', is_staff=True,
+        )
+        for start in range(0, customers, BATCH_SIZE):
+            batch = []
+            for i in range(start, min(start + BATCH_SIZE, customers)):
+                city, state = rng.choice(CITIES)
+                batch.append(Customer(
+                    username=f'{PREFIX}-{i:07d}', email=f'{PREFIX}-{i:07d}@example.com', password=password,
+                    customer_name=f'Customer {i}', phone_number=f'9{rng.randrange(10 ** 9):09d}',
+                    address=f'{rng.randrange(1, 500)} Main Road', city=city, state=state,
+                ))
+            Customer.objects.bulk_create(batch)
+        log(f"{customers} customers")
+
+        categories = [category for category, _ in Product.CATEGORY_CHOICES]
+        product_rows = []
+        for i in range(products):
+            category = categories[i % len(categories)]
+            words, (low, high) = CATALOG[category]
+            name = ' '.join(rng.sample(words, 3))
+            product_rows.append(Product(
+                name=f'{PREFIX.title()} {name} {i}', category=category, price=rng.randrange(low, high, 100),
+                description=f'{name} in {rng.choice(["silver", "space grey", "midnight", "starlight"])}.',
+                stock=rng.choice([None, 10 ** 6]),
+            ))
+        product_rows = Product.objects.bulk_create(product_rows, batch_size=BATCH_SIZE)
+        get_search_backend().index([product.pk for product in product_rows])
+        log(f"{products} products")
+
+        generate_orders(rng, orders, product_rows)
+        log(f"{orders} orders")
+        rebuild_rollups()
+        # bulk_create() sends no signals
+        catalog_cache.bump_version()
+    return staff
+
+
+def generate_orders(rng, count, products):
+    user_ids = list(bench_customers().exclude(is_staff=True).values_list('id', flat=True))
+    if not (count and user_ids and products):
+        return
+    statuses = [status for status, _ in Orders.SHIPPING_STATUS_CHOICES]
+    now = timezone.now()
+    for start in range(0, count, BATCH_SIZE):
+        size = min(BATCH_SIZE, count - start)
+        lines = [rng.sample(products, min(len(products), rng.randint(1, 4))) for _ in range(size)]
+        quantities = [[rng.randint(1, 3) for _ in order_products] for order_products in lines]
+        orders = Orders.objects.bulk_create([
+            Orders(
+                user_id=rng.choice(user_ids), shipping_status=rng.choice(statuses),
+                total_amount=sum(Decimal(p.price) * q for p, q in zip(order_products, order_quantities)),
+            )
+            for order_products, order_quantities in zip(lines, quantities)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem.for_product(product, order=order, quantity=quantity)
+            for order, order_products, order_quantities in zip(orders, lines, quantities)
+            for product, quantity in zip(order_products, order_quantities)
+        ])
+        # created_at is auto_now_add, so spread the orders over the past year afterwards
+        by_day = {}
+        for order in orders:
+            by_day.setdefault(rng.randrange(365), []).append(order.id)
+        for days, ids in by_day.items():
+            Orders.objects.filter(id__in=ids).update(created_at=now - timedelta(days=days, seconds=rng.randrange(86400)))
+
+
+def clear():
+    """Delete all generated data. Carts, orders and order items go with their customers."""
+    with transaction.atomic():
+        bench_customers().delete()
+        # Product deletes unindex themselves through api.signals
+        bench_products().delete()
+        rebuild_rollups()
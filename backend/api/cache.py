@@ -0,0 +1,221 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.utils.module_loading import import_string
+
+from .renderers import FastJSONRenderer
+
+
+class SharedVersion:
+    """
+    Keeps the catalog version in one of Django's configured caches, so a
+    bump from any worker, the admin or a management command reaches every
+    process that shares that cache.
+    """
+    version_key = 'catalog:version'
+
+    def get_version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            self.cache.add(self.version_key, 1, None)
+            version = self.cache.get(self.version_key, 1)
+        return version
+
+    def bump_version(self):
+        try:
+            return self.cache.incr(self.version_key)
+        except ValueError:
+            self.cache.add(self.version_key, 2, None)
+            return self.cache.get(self.version_key)
+
+
+class LRUCacheBackend(SharedVersion):
+    """
+    In-process cache bounded to `max_entries` items, evicting the least
+    recently used entry first. Entries expire after `timeout` seconds, which
+    bounds how stale a worker can be when CACHES[version_alias] is not
+    shared between processes.
+    """
+    def __init__(self, max_entries=1024, timeout=None, version_alias='default'):
+        self.max_entries = max_entries
+        self.timeout = settings.CATALOG_CACHE_TIMEOUT if timeout is None else timeout
+        self.cache = caches[version_alias]
+        # A local-memory version is cheap enough to read straight from async code
+        self.in_memory = isinstance(self.cache, LocMemCache)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return None
+            expires, value = self._entries[key]
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump_version(self):
+        version = super().bump_version()
+        # Older versions can never be read again, so free them right away
+        with self._lock:
+            self._entries.clear()
+        return version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend(SharedVersion):
+    """
+    Stores entries in one of Django's configured caches (e.g. Redis or
+    memcached), so every worker shares the same entries and version.
+    """
+    in_memory = False
+
+    def __init__(self, alias='default', timeout=None):
+        self.cache = caches[alias]
+        self.timeout = settings.CATALOG_CACHE_TIMEOUT if timeout is None else timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def clear(self):
+        self.cache.delete(self.version_key)
+
+
+class CatalogCache:
+    """
+    Read-through cache of rendered catalog responses. Entries are keyed by
+    the catalog version, so bumping the version on any product write
+    invalidates everything at once.
+    """
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            config = settings.CATALOG_CACHE
+            self._backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+        return self._backend
+
+    def reset(self):
+        """Drop the backend so it is rebuilt from settings, and zero the counters."""
+        if self._backend is not None:
+            self._backend.clear()
+        self._backend = None
+        self.hits = 0
+        self.misses = 0
+
+    def bump_version(self):
+        """
+        Invalidate every entry once the current transaction commits, so no
+        request can cache rows that are about to change under the new version.
+        """
+        transaction.on_commit(self.backend.bump_version)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'version': self.backend.get_version()}
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def full_key(self, key, version):
+        return f"catalog:{version}:{key}"
+
+    def encode(self, data):
+        body = FastJSONRenderer().render(data)
+        return ('"%s"' % hashlib.md5(body).hexdigest(), body)
+
+    def get_or_build(self, key, build):
+        """
+        Return the cached (etag, body) pair for `key`, calling `build()` to
+        produce the response data on a miss.
+        """
+        full_key = self.full_key(key, self.backend.get_version())
+        entry = self.backend.get(full_key)
+        if entry is not None:
+            self._count(hit=True)
+            return entry
+
+        self._count(hit=False)
+        entry = self.encode(build())
+        self.backend.set(full_key, entry)
+        return entry
+
+    async def aget_or_build(self, key, build):
+        """
+        Async get_or_build, where `build` is a coroutine function. Backends
+        that talk to a cache server are called from a thread.
+        """
+        full_key = self.full_key(key, await self._call('get_version'))
+        entry = await self._call('get', full_key)
+        if entry is not None:
+            self._count(hit=True)
+            return entry
+
+        self._count(hit=False)
+        entry = self.encode(await build())
+        await self._call('set', full_key, entry)
+        return entry
+
+    async def _call(self, name, *args):
+        method = getattr(self.backend, name)
+        if self.backend.in_memory:
+            return method(*args)
+        return await sync_to_async(method)(*args)
+
+    def make_response(self, request, entry):
+        """
+        A JSON response for a cached entry, or 304 Not Modified when the
+        client's If-None-Match is still current.
+        """
+        etag, body = entry
+        # If-None-Match uses the weak comparison
+        etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+        if '*' in etags or etag in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+    def respond(self, request, build):
+        """Serve a JSON response for `request` from the cache."""
+        return self.make_response(request, self.get_or_build(request.build_absolute_uri(), build))
+
+    async def arespond(self, request, build):
+        return self.make_response(request, await self.aget_or_build(request.build_absolute_uri(), build))
+
+
+catalog_cache = CatalogCache()
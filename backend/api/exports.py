@@ -0,0 +1,134 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import OrderItem
+
+# Rows fetched per query. Each batch of orders costs one more query for its items.
+CHUNK_SIZE = 1000
+# Lines are joined into blocks of about this many characters before being sent
+BLOCK_SIZE = 64 * 1024
+
+ORDER_FIELDS = {
+    'id': 'order_id', 'created_at': 'created_at', 'shipping_status': 'shipping_status',
+    'total_amount': 'total_amount', 'user_id': 'customer_id', 'user__username': 'username', 'user__email': 'email',
+}
+ITEM_FIELDS = {
+    'product_id': 'product_id', 'product_name': 'product_name', 'product_category': 'category',
+    'quantity': 'quantity', 'price': 'unit_price',
+}
+CUSTOMER_FIELDS = [
+    'id', 'username', 'customer_name', 'email', 'phone_number', 'address', 'city', 'state', 'is_staff', 'last_login',
+]
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def order_records(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield each order in `queryset` as a dict with an `items` list, reading
+    `chunk_size` orders at a time so memory does not grow with the export.
+    """
+    rows = queryset.order_by('id').values(*ORDER_FIELDS).iterator(chunk_size=chunk_size)
+    for batch in batched(rows, chunk_size):
+        items = {}
+        lines = (
+            OrderItem.objects.filter(order_id__in=[row['id'] for row in batch])
+            .order_by('id')
+            .values('order_id', *ITEM_FIELDS)
+        )
+        for line in lines:
+            items.setdefault(line['order_id'], []).append({name: line[field] for field, name in ITEM_FIELDS.items()})
+        for row in batch:
+            record = {name: row[field] for field, name in ORDER_FIELDS.items()}
+            record['items'] = items.get(row['id'], [])
+            yield record
+
+
+def order_csv_rows(records):
+    """One row per line item, repeating the order's columns; orders without items get one row."""
+    yield list(ORDER_FIELDS.values()) + list(ITEM_FIELDS.values())
+    empty = dict.fromkeys(ITEM_FIELDS.values(), '')
+    for record in records:
+        order = [record[name] for name in ORDER_FIELDS.values()]
+        for item in record['items'] or [empty]:
+            yield order + list(item.values())
+
+
+def customer_records(queryset, chunk_size=CHUNK_SIZE):
+    return queryset.order_by('id').values(*CUSTOMER_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def customer_csv_rows(records):
+    yield CUSTOMER_FIELDS
+    for record in records:
+        yield [record[name] for name in CUSTOMER_FIELDS]
+
+
+EXPORTS = {
+    'orders': (order_records, order_csv_rows),
+    'customers': (customer_records, customer_csv_rows),
+}
+
+
+class Echo:
+    """File-like object whose write() hands back the line csv.writer produced."""
+    def write(self, value):
+        return value
+
+
+def csv_cell(value):
+    # Keep spreadsheet apps from running user-entered text as a formula
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row])
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def blocks(lines, size=BLOCK_SIZE):
+    block, length = [], 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(block)
+            block, length = [], 0
+    if block:
+        yield ''.join(block)
+
+
+def export_blocks(kind, export_format, queryset, chunk_size=CHUNK_SIZE):
+    """The export of `queryset` as an iterator of text blocks in `export_format`."""
+    records, csv_rows = EXPORTS[kind]
+    records = records(queryset, chunk_size)
+    lines = csv_lines(csv_rows(records)) if export_format == 'csv' else ndjson_lines(records)
+    return blocks(lines)
+
+
+def export_response(kind, export_format, queryset):
+    response = StreamingHttpResponse(export_blocks(kind, export_format, queryset), content_type=FORMATS[export_format])
+    filename = f'{kind}-{timezone.localdate().isoformat()}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
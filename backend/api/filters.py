@@ -0,0 +1,55 @@
+import django_filters
+from django.db.models import Q
+from rest_framework import filters
+
+from .models import Customer, Orders
+
+
+class OrderFilter(django_filters.FilterSet):
+    created_after = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
+    total_min = django_filters.NumberFilter(field_name='total_amount', lookup_expr='gte')
+    total_max = django_filters.NumberFilter(field_name='total_amount', lookup_expr='lte')
+
+    class Meta:
+        model = Orders
+        fields = ['shipping_status', 'created_at']
+
+
+class OrderSearchFilter(filters.SearchFilter):
+    """
+    Index-friendly order search: a numeric term is an exact order id lookup,
+    anything else is a username prefix match.
+    """
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        # isdigit() alone also accepts digits like '²' that int() rejects
+        if term.isascii() and term.isdigit():
+            return queryset.filter(id=int(term))
+        return queryset.filter(user__username__startswith=term)
+
+
+class CustomerFilter(django_filters.FilterSet):
+    class Meta:
+        model = Customer
+        fields = ['city', 'state', 'is_staff']
+
+
+class CustomerSearchFilter(filters.SearchFilter):
+    """
+    Case-insensitive prefix search over username, name, email and phone
+    number. Unlike icontains, a prefix match can use an index: see
+    migration 0011.
+    """
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        return queryset.filter(
+            Q(username__istartswith=term)
+            | Q(customer_name__istartswith=term)
+            | Q(email__istartswith=term)
+            | Q(phone_number__istartswith=term)
+        )
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def tuned(base, name, param):
+    """
+    A hasher cost parameter read from PASSWORD_HASHER_PARAMS[name], falling
+    back to Django's default. Hashes made with other values are upgraded on
+    the user's next login.
+    """
+    default = getattr(base, param)
+    return property(lambda self: settings.PASSWORD_HASHER_PARAMS.get(name, {}).get(param, default))
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    work_factor = tuned(hashers.ScryptPasswordHasher, 'scrypt', 'work_factor')
+    block_size = tuned(hashers.ScryptPasswordHasher, 'scrypt', 'block_size')
+    parallelism = tuned(hashers.ScryptPasswordHasher, 'scrypt', 'parallelism')
+
+    @property
+    def maxmem(self):
+        # scrypt needs 128 * n * r bytes; OpenSSL refuses more than 32MB unless told
+        return max(32 * 1024 * 1024, 2 * 128 * self.work_factor * self.block_size)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Needs the argon2-cffi package."""
+    time_cost = tuned(hashers.Argon2PasswordHasher, 'argon2', 'time_cost')
+    memory_cost = tuned(hashers.Argon2PasswordHasher, 'argon2', 'memory_cost')
+    parallelism = tuned(hashers.Argon2PasswordHasher, 'argon2', 'parallelism')
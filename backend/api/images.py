@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Widths for product cards and detail pages, each also stored as WebP
+VARIANT_WIDTHS = {'thumb': 150, 'card': 300, 'detail': 800}
+VARIANT_DIR = 'variants'
+
+
+def variant_name(source_name, width, extension, content):
+    """
+    Storage name for one variant. The content hash makes the name change
+    whenever the bytes do, so variants can be cached forever.
+    """
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    return f'{VARIANT_DIR}/{stem}-{width}w-{digest}.{extension}'
+
+
+def encode(image, image_format):
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+    elif image_format == 'WEBP':
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        image.save(buffer, 'WEBP', quality=80, method=4)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def build_variants(field_file):
+    """
+    Resize an uploaded image to each of VARIANT_WIDTHS, never upscaling, in
+    its own format (JPEG or PNG) and as WebP. Returns the map stored on the
+    model: {'source': name, 'webp': {width: name}, 'jpeg' or 'png': {...}}.
+    """
+    with field_file.open('rb') as f:
+        original = Image.open(f)
+        source_format = original.format
+        original = ImageOps.exif_transpose(original)
+    fallback = 'PNG' if source_format == 'PNG' and original.mode in ('RGBA', 'LA', 'P') else 'JPEG'
+
+    variants = {'source': field_file.name, 'webp': {}, fallback.lower(): {}}
+    for width in sorted({min(width, original.width) for width in VARIANT_WIDTHS.values()}):
+        resized = original.copy()
+        if width < original.width:
+            resized = resized.resize((width, round(original.height * width / original.width)), Image.LANCZOS)
+        for image_format in ('WEBP', fallback):
+            content = encode(resized, image_format)
+            name = variant_name(field_file.name, width, image_format.lower(), content)
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(content))
+            variants[image_format.lower()][str(width)] = name
+    return variants
+
+
+def needs_variants(field_file, variants):
+    """Whether the stored variants were built from some other file, or the image was removed."""
+    return (variants or {}).get('source') != (field_file.name if field_file else None)
+
+
+def variant_urls(variants, url=None):
+    """
+    The {format: {width: url}} map the serializers expose, for building
+    srcset attributes. `url` turns a stored name into its URL.
+    """
+    url = url or default_storage.url
+    return {
+        image_format: {width: url(name) for width, name in names.items()}
+        for image_format, names in (variants or {}).items()
+        if image_format != 'source'
+    }
+
+
+class VariantWorkerPool:
+    """
+    Runs variant jobs on IMAGE_VARIANT_WORKERS background threads, once the
+    transaction that saved the image commits. With 0 workers jobs run inline
+    at commit, which tests rely on.
+    """
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, job, *args):
+        if settings.IMAGE_VARIANT_WORKERS <= 0:
+            transaction.on_commit(lambda: job(*args))
+        else:
+            transaction.on_commit(lambda: self.executor.submit(self._run, job, *args))
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_VARIANT_WORKERS, thread_name_prefix='image-variants'
+                )
+            return self._executor
+
+    def _run(self, job, *args):
+        close_old_connections()
+        try:
+            job(*args)
+        except Exception:
+            logger.exception("Could not generate image variants")
+        finally:
+            close_old_connections()
+
+
+variant_pool = VariantWorkerPool()
+
+
+def process_variants(model, pk, field, variants_field, force=False):
+    """
+    Build and store variants for one row's image. Returns whether anything
+    was written. Uses update() so the save signals that scheduled this do
+    not fire again.
+    """
+    instance = model.objects.filter(pk=pk).only('pk', field, variants_field).first()
+    if instance is None:
+        return False
+    field_file = getattr(instance, field)
+    if not (force or needs_variants(field_file, getattr(instance, variants_field))):
+        return False
+    if field_file:
+        variants = build_variants(field_file)
+        unchanged = Q(**{field: field_file.name})
+    else:
+        variants = {}
+        unchanged = Q(**{f'{field}__isnull': True}) | Q(**{field: ''})
+    # Matches nothing if the image was replaced meanwhile; that upload has its own job
+    return bool(model.objects.filter(unchanged, pk=pk).update(**{variants_field: variants}))
@@ -0,0 +1,195 @@
+import csv
+import json
+
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .cache import catalog_cache
+from .exports import batched
+from .models import Product
+from .search import get_search_backend
+from .serializers import ProductImportSerializer
+
+# Rows validated and upserted together, in one transaction
+CHUNK_SIZE = 1000
+# Errors and superseded rows listed in a result; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+FIELDS = ProductImportSerializer.Meta.fields
+
+
+class UTF8Lines:
+    """
+    The lines of a UTF-8 byte stream as text, without a leading BOM. A line
+    that is not valid UTF-8 raises UnicodeDecodeError, with `line_num` set
+    to its line number.
+    """
+    def __init__(self, stream):
+        self.stream = iter(stream)
+        self.line_num = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self.stream)
+        self.line_num += 1
+        return line.decode('utf-8-sig' if self.line_num == 1 else 'utf-8')
+
+
+def csv_rows(stream):
+    """
+    Yield (line number, row, error) for each record of a CSV file with a
+    header row. Empty cells are left out of the row, so they leave an
+    existing product's value unchanged. Reading stops at the first line
+    that is not valid UTF-8, which is reported as an error.
+    """
+    lines = UTF8Lines(stream)
+    reader = csv.DictReader(lines)
+    try:
+        fieldnames = reader.fieldnames
+    except UnicodeDecodeError:
+        raise ParseError("The CSV header is not valid UTF-8.")
+    if fieldnames is not None and 'sku' not in fieldnames:
+        raise ParseError("The CSV header must include a sku column.")
+    try:
+        for row in reader:
+            yield reader.line_num, {name: value for name, value in row.items() if name in FIELDS and value}, None
+    except UnicodeDecodeError:
+        yield lines.line_num, None, "Not valid UTF-8; the rest of the file was not read."
+
+
+def ndjson_rows(stream):
+    """Yield (line number, row, error) for each line of a JSON-lines file."""
+    for number, line in enumerate(stream, 1):
+        try:
+            line = line.decode('utf-8-sig' if number == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            yield number, None, "Not valid UTF-8."
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield number, row, None
+        else:
+            yield number, None, "Expected a JSON object."
+
+
+class ProductCSVParser(BaseParser):
+    """Hands the view a lazy iterator of rows, so the upload is never held in memory."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return csv_rows(stream)
+
+
+class ProductNDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return ndjson_rows(stream)
+
+
+class ProductImporter:
+    """
+    Upsert products by SKU from (line number, row, error) tuples, validating
+    and writing `chunk_size` rows at a time with bulk_create(update_conflicts=True).
+    Invalid rows are reported with their line number and skipped; the rest
+    of the import carries on. Rows replaced by a later row for the same SKU
+    in a chunk are reported apart from them, as superseded. The catalog
+    cache is invalidated once at the end.
+    """
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        self.superseded_count = 0
+        self.superseded = []
+        self.validator = ProductImportSerializer()
+
+    def run(self, rows):
+        try:
+            for chunk in batched(rows, self.chunk_size):
+                self.import_chunk(chunk)
+        finally:
+            if self.created or self.updated:
+                catalog_cache.bump_version()
+        return self
+
+    def result(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'superseded_count': self.superseded_count,
+            'superseded': self.superseded,
+        }
+
+    def error(self, line, sku, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'sku': sku, 'errors': errors})
+
+    def supersede(self, line, sku, by_line):
+        self.superseded_count += 1
+        if len(self.superseded) < MAX_REPORTED_ERRORS:
+            self.superseded.append({'line': line, 'sku': sku, 'superseded_by': by_line})
+
+    def import_chunk(self, chunk):
+        # SKU -> (line, validated row); a later row for the same SKU wins
+        rows = {}
+        for line, data, error in chunk:
+            if error:
+                self.error(line, None, {'non_field_errors': [error]})
+                continue
+            try:
+                validated = self.validator.run_validation(data)
+            except serializers.ValidationError as e:
+                self.error(line, data.get('sku'), e.detail)
+                continue
+            previous = rows.get(validated['sku'])
+            if previous:
+                self.supersede(previous[0], validated['sku'], line)
+            rows[validated['sku']] = (line, validated)
+        if not rows:
+            return
+
+        try:
+            with transaction.atomic():
+                self.upsert([validated for _, validated in rows.values()])
+        except DatabaseError:
+            # Find the offending rows and keep the others
+            for line, validated in rows.values():
+                try:
+                    with transaction.atomic():
+                        self.upsert([validated])
+                except DatabaseError as e:
+                    self.error(line, validated['sku'], {'non_field_errors': [str(e)]})
+
+    def upsert(self, rows):
+        skus = [row['sku'] for row in rows]
+        existing = set(Product.objects.filter(sku__in=skus).values_list('sku', flat=True))
+        # Rows with the same columns go in one statement, which updates just those columns
+        by_columns = {}
+        for row in rows:
+            by_columns.setdefault(tuple(sorted(row)), []).append(Product(**row))
+        for columns, products in by_columns.items():
+            update_fields = [column for column in columns if column != 'sku']
+            if update_fields:
+                Product.objects.bulk_create(
+                    products, update_conflicts=True, unique_fields=['sku'], update_fields=update_fields
+                )
+            else:
+                Product.objects.bulk_create(products, ignore_conflicts=True)
+        get_search_backend().index(list(Product.objects.filter(sku__in=skus).values_list('id', flat=True)))
+        self.created += len(rows) - len(existing)
+        self.updated += len(existing)
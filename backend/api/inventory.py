@@ -0,0 +1,107 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import OrderItem, Product
+
+
+class PartialUpdate(Exception):
+    """Rolls back a stock UPDATE that did not cover every product."""
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when one or more products cannot cover the requested quantities.
+    """
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Insufficient stock for products {self.product_ids}")
+
+
+def quantities_by_product(lines):
+    """Sum (product_id, quantity) pairs into a {product_id: quantity} dict."""
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def per_product(quantities):
+    return Case(
+        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def reserve(lines):
+    """
+    Take stock for (product_id, quantity) lines with one conditional UPDATE.
+    Products whose stock is NULL are not tracked and always succeed. If any
+    tracked product is short, no stock is taken and InsufficientStock is
+    raised.
+    """
+    quantities = quantities_by_product(lines)
+    if not quantities:
+        return
+    needed = per_product(quantities)
+    try:
+        # The savepoint undoes the rows that did have enough stock, so the
+        # shortfall below is computed from the original values
+        with transaction.atomic():
+            updated = (
+                Product.objects.filter(id__in=list(quantities))
+                .filter(Q(stock__isnull=True) | Q(stock__gte=needed))
+                .update(stock=F('stock') - needed)
+            )
+            if updated != len(quantities):
+                raise PartialUpdate
+    except PartialUpdate:
+        stock = dict(Product.objects.filter(id__in=list(quantities)).values_list('id', 'stock'))
+        short = [
+            product_id for product_id, quantity in quantities.items()
+            if product_id not in stock or (stock[product_id] is not None and stock[product_id] < quantity)
+        ]
+        # Stock may have been put back since the UPDATE; still report the order
+        raise InsufficientStock(short or quantities)
+
+
+def release(lines):
+    """
+    Put stock back for (product_id, quantity) lines, e.g. when an order is
+    cancelled.
+    """
+    quantities = quantities_by_product(lines)
+    if quantities:
+        Product.objects.filter(id__in=list(quantities), stock__isnull=False).update(
+            stock=F('stock') + per_product(quantities)
+        )
+
+
+def order_lines(order):
+    # Lines whose product has since been deleted have no stock to move
+    return OrderItem.objects.filter(order=order, product__isnull=False).values_list('product_id', 'quantity')
+
+
+def adjust(deltas):
+    """
+    Add signed {product_id: delta} amounts to tracked stock in one UPDATE.
+    Raises InsufficientStock, without changing anything, for products that are
+    untracked or would go below zero.
+    """
+    if not deltas:
+        return
+    change = per_product(deltas)
+    try:
+        with transaction.atomic():
+            updated = (
+                Product.objects.filter(id__in=list(deltas), stock__isnull=False)
+                .filter(stock__gte=-change)
+                .update(stock=F('stock') + change)
+            )
+            if updated != len(deltas):
+                raise PartialUpdate
+    except PartialUpdate:
+        stock = dict(Product.objects.filter(id__in=list(deltas)).values_list('id', 'stock'))
+        raise InsufficientStock(
+            product_id for product_id, delta in deltas.items()
+            if stock.get(product_id) is None or stock[product_id] + delta < 0
+        )
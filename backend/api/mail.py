@@ -0,0 +1,124 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Emails stuck in 'sending' this long (e.g. after a worker crash) are retried
+SENDING_LEASE = timedelta(minutes=5)
+
+
+def queue_email(subject, message, recipient_list, html_template='', context=None, from_email=None):
+    """
+    Store an email in the outbox instead of sending it during the request.
+    Called inside a transaction, the email is only queued if it commits.
+    `manage.py send_queued_mail` delivers it.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.EMAIL_HOST_USER,
+        recipients=list(recipient_list),
+        html_template=html_template,
+        context=context or {},
+    )
+
+
+def build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.recipients, connection=connection
+    )
+    if email.html_template:
+        message.attach_alternative(render_to_string(email.html_template, email.context), 'text/html')
+    return message
+
+
+def send_batch(emails):
+    """
+    Send `emails` over a single reused mail connection. Returns a list of
+    (email, error) pairs, where error is None for delivered messages.
+    """
+    results = []
+    connection = get_connection()
+    try:
+        connection.open()
+        for email in emails:
+            try:
+                build_message(email, connection).send()
+                results.append((email, None))
+            except Exception as e:
+                results.append((email, e))
+    except Exception as e:
+        # Could not connect at all; every message in the batch failed
+        done = {email.id for email, _ in results}
+        results.extend((email, e) for email in emails if email.id not in done)
+    finally:
+        connection.close()
+    return results
+
+
+def claim_due_emails(limit):
+    """
+    Mark up to `limit` due emails as sending and return them. Rows locked by
+    another worker are skipped, so several workers can share the outbox.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        OutboundEmail.objects.filter(id__in=[email.id for email in emails]).update(
+            status='sending', next_attempt_at=now + SENDING_LEASE
+        )
+    return emails
+
+
+def record_results(results):
+    now = timezone.now()
+    for email, error in results:
+        email.attempts += 1
+        if error is None:
+            email.status = 'sent'
+            email.sent_at = now
+            email.last_error = ''
+        elif email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Giving up on email {email.id} after {email.attempts} attempts: {error}")
+            email.status = 'failed'
+            email.last_error = str(error)
+        else:
+            delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+            email.status = 'pending'
+            email.next_attempt_at = now + timedelta(seconds=delay)
+            email.last_error = str(error)
+    OutboundEmail.objects.bulk_update(
+        [email for email, _ in results], ['status', 'attempts', 'sent_at', 'next_attempt_at', 'last_error']
+    )
+
+
+def process_outbox(batch_size=100, workers=4):
+    """
+    Deliver one batch of due emails, split across `workers` threads that each
+    hold one mail connection. Returns the number of emails processed, sent or
+    rescheduled.
+    """
+    emails = claim_due_emails(batch_size)
+    if not emails:
+        return 0
+
+    chunks = [emails[i::workers] for i in range(workers) if emails[i::workers]]
+    results = []
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        for chunk_results in pool.map(send_batch, chunks):
+            results.extend(chunk_results)
+    record_results(results)
+    return len(results)
@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import filters, generics
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api import benchdata
+from api.models import Customer
+from api.serializers import CustomerSerializer
+from api.views import CustomerList
+
+
+class LegacyCustomerList(generics.ListAPIView):
+    # CustomerList before pagination: every row, full serializer, icontains search
+    queryset = Customer.objects.all()
+    serializer_class = CustomerSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['username', 'customer_name', 'email', 'phone_number']
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the admin customer directory against the old unpaginated version over the customers "
+        "from generate_bench_data, e.g. after `generate_bench_data --customers 500000 --products 0 "
+        "--orders 0`. Read-only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Requests per case for the new view.")
+        parser.add_argument('--legacy-repeat', type=int, default=1, help="Requests per case for the old view.")
+        parser.add_argument('--skip-legacy', action='store_true')
+
+    def handle(self, *args, **options):
+        admin = benchdata.bench_customers().filter(is_staff=True).first()
+        sample = benchdata.bench_customers().filter(is_staff=False).order_by('-id').first()
+        if admin is None or sample is None:
+            raise CommandError("No generated customers; run generate_bench_data first")
+        total = Customer.objects.count()
+        self.stdout.write(f"{total} customers")
+
+        cases = [
+            ("first page", {}, True),
+            ("page 100", {'page': 100}, False),
+            ("city filter", {'city': sample.city}, False),
+            ("staff filter", {'is_staff': 'true'}, False),
+            ("username search", {'search': sample.username[:-2]}, True),
+            ("name search", {'search': sample.customer_name}, True),
+            ("phone search", {'search': sample.phone_number[:6]}, True),
+        ]
+        factory = APIRequestFactory()
+        self.stdout.write(f"{'case':<18} {'view':<8} {'rows':>7} {'queries':>8} {'mean ms':>10} {'bytes':>11}")
+        for label, params, legacy_too in cases:
+            views = [("paged", CustomerList.as_view(), options['repeat'])]
+            if legacy_too and not options['skip_legacy']:
+                views.append(("legacy", LegacyCustomerList.as_view(), options['legacy_repeat']))
+            for view_label, view, repeat in views:
+                timings = []
+                for _ in range(repeat):
+                    request = factory.get('/api/customers/', params)
+                    force_authenticate(request, admin)
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        response = view(request).render()
+                        timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f"{label} returned {response.status_code}")
+                data = response.data
+                rows = len(data['results'] if isinstance(data, dict) else data)
+                self.stdout.write(
+                    f"{label:<18} {view_label:<8} {rows:>7} {len(queries):>8} "
+                    f"{sum(timings) / len(timings):>10.1f} {len(response.content):>11}"
+                )
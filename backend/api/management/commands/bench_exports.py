@@ -0,0 +1,48 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api import exports
+from api.models import Customer, Orders
+from api.serializers import OrderSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare peak Python memory and time of serializing every order at once, as AllOrderList did "
+        "without pagination, with the streaming CSV and NDJSON exports. Read-only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-legacy', action='store_true')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{Orders.objects.count()} orders, {Customer.objects.count()} customers")
+        self.stdout.write(f"{'export':<28} {'seconds':>8} {'peak MB':>8} {'output MB':>10}")
+        runs = []
+        if not options['skip_legacy']:
+            runs.append(("orders, serialized at once", self.legacy))
+        for kind in ('orders', 'customers'):
+            for export_format in exports.FORMATS:
+                runs.append((f"{kind}, streamed {export_format}", self.streamed(kind, export_format)))
+        for label, run in runs:
+            start = time.perf_counter()
+            size = run()
+            elapsed = time.perf_counter() - start
+            # Traced separately, as tracemalloc slows everything down several times
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.stdout.write(f"{label:<28} {elapsed:>8.2f} {peak / 2 ** 20:>8.1f} {size / 2 ** 20:>10.1f}")
+
+    def legacy(self):
+        orders = OrderSerializer.setup_eager_loading(Orders.objects.order_by('id'))
+        return len(JSONRenderer().render(OrderSerializer(orders, many=True).data))
+
+    def streamed(self, kind, export_format):
+        queryset = Orders.objects.all() if kind == 'orders' else Customer.objects.all()
+        # Consume the blocks as a client would, keeping only their size
+        return lambda: sum(len(block) for block in exports.export_blocks(kind, export_format, queryset))
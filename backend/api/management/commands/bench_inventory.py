@@ -0,0 +1,75 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Sum
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Cart, CartItem, Customer, OrderItem, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire parallel checkouts at one product with limited stock and report throughput and oversell. "
+        "Data is committed so worker threads can see it, and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkouts', type=int, default=300, help="Customers each trying to buy one unit.")
+        parser.add_argument('--stock', type=int, default=100, help="Units of the hot product on hand.")
+        parser.add_argument('--threads', type=int, default=32, help="Concurrent checkout threads.")
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        product = Product.objects.create(name=f"Hot product {run_id}", price=100, category='others', stock=options['stock'])
+        customers = Customer.objects.bulk_create(
+            Customer(username=f'bench-{run_id}-{i}', email=f'bench-{run_id}-{i}@example.com', password='!')
+            for i in range(options['checkouts'])
+        )
+        carts = Cart.objects.bulk_create(Cart(user=customer) for customer in customers)
+        CartItem.objects.bulk_create(CartItem(cart=cart, product=product, quantity=1) for cart in carts)
+
+        try:
+            with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                    results = list(pool.map(self.checkout, customers))
+                elapsed = time.perf_counter() - start
+            self.report(product, options['stock'], results, elapsed)
+        finally:
+            Customer.objects.filter(username__startswith=f'bench-{run_id}-').delete()
+            product.delete()
+
+    def checkout(self, customer):
+        client = APIClient()
+        client.force_authenticate(customer)
+        try:
+            return client.post(reverse('place_order')).status_code
+        except Exception as e:
+            return type(e).__name__
+        finally:
+            connections.close_all()
+
+    def report(self, product, initial_stock, results, elapsed):
+        product.refresh_from_db()
+        sold = OrderItem.objects.filter(product=product).aggregate(units=Sum('quantity'))['units'] or 0
+        placed = results.count(201)
+        rejected = results.count(409)
+        errors = len(results) - placed - rejected
+        oversell = max(0, sold - initial_stock)
+
+        self.stdout.write(f"checkouts        {len(results)}")
+        self.stdout.write(f"placed           {placed}")
+        self.stdout.write(f"out of stock     {rejected}")
+        self.stdout.write(f"errors           {errors}")
+        self.stdout.write(f"units sold       {sold} of {initial_stock}")
+        self.stdout.write(f"stock remaining  {product.stock}")
+        self.stdout.write(f"elapsed          {elapsed:.2f}s ({len(results) / elapsed:.0f} checkouts/s)")
+        if oversell or sold + product.stock != initial_stock:
+            self.stderr.write(self.style.ERROR(f"Oversold by {oversell} units"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Oversell         0"))
@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.authentication import last_login_buffer
+from api.models import Customer
+
+PBKDF2 = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+
+# (label, hasher list, last_login flush interval)
+CONFIGS = [
+    ("before: pbkdf2, last_login per login", [PBKDF2], 0),
+    ("after: scrypt, batched last_login", settings.PASSWORD_HASHERS, 3600),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time sequential logins, i.e. the throughput of one sync worker, with the old PBKDF2 setup "
+        "and the configured hasher with batched last_login writes. All data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--logins', type=int, default=100, help="Logins timed per configuration.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'configuration':<40} {'logins/s':>9} {'mean ms':>9}")
+        for label, hashers, interval in CONFIGS:
+            with override_settings(PASSWORD_HASHERS=hashers, LAST_LOGIN_FLUSH_INTERVAL=interval):
+                with transaction.atomic():
+                    elapsed = self.run(options['users'], options['logins'])
+                    transaction.set_rollback(True)
+            self.stdout.write(f"{label:<40} {options['logins'] / elapsed:>9.1f} {elapsed * 1000 / options['logins']:>9.1f}")
+
+    def run(self, user_count, login_count):
+        # Every user shares one hash made with the hasher under test
+        password = make_password('bench-password')
+        Customer.objects.bulk_create(
+            Customer(username=f'bench-login-{i}', email=f'bench-login-{i}@example.com', password=password)
+            for i in range(user_count)
+        )
+        client = APIClient()
+        start = time.perf_counter()
+        for i in range(login_count):
+            response = client.post(reverse('login_customer'), {
+                'username': f'bench-login-{i % user_count}', 'password': 'bench-password',
+            })
+            assert response.status_code == 200, response.data
+        # Count the batched writes too
+        last_login_buffer.flush()
+        return time.perf_counter() - start
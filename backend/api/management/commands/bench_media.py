@@ -0,0 +1,71 @@
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.views.static import serve
+
+from api.media import media_index, serve_media
+
+
+class Command(BaseCommand):
+    help = (
+        "Time serving the files under MEDIA_ROOT with django.views.static.serve (what static() "
+        "routed to) against api.media.serve_media, for full, conditional and range requests. "
+        "Runs in-process; nothing is written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20, help="Passes over every file.")
+
+    def handle(self, *args, **options):
+        root = settings.MEDIA_ROOT
+        names = [
+            os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/')
+            for directory, _, files in os.walk(root) for name in files
+        ]
+        if not names:
+            raise CommandError(f"No files under {root}")
+
+        factory = RequestFactory()
+        media_index.reset()
+        views = [
+            ("static.serve", lambda request, name: serve(request, name, document_root=root)),
+            ("serve_media", serve_media),
+        ]
+        requests = [
+            ("full", lambda response: {}),
+            ("if-none-match", lambda response: {'if_none_match': response['ETag']}),
+            ("if-modified-since", lambda response: {'if_modified_since': response['Last-Modified']}),
+            ("range", lambda response: {'range': 'bytes=0-1023'}),
+        ]
+        # Validators as a client would have them from an earlier 200
+        validators = {}
+        for name in names:
+            response = serve_media(factory.get(f'/media/{name}'), name)
+            response.close()
+            validators[name] = response
+
+        self.stdout.write(f"{len(names)} files under {root}")
+        self.stdout.write(f"{'view':<14} {'request':<18} {'status':>6} {'mean us':>9} {'p95 us':>9}")
+        for kind, make_headers in requests:
+            for label, view in views:
+                timings, statuses = [], set()
+                for _ in range(options['rounds']):
+                    for name in names:
+                        request = factory.get(f'/media/{name}', headers=make_headers(validators[name]))
+                        began = time.perf_counter()
+                        response = view(request, name)
+                        # Include reading the body, which is what the client waits for
+                        for _ in response:
+                            pass
+                        response.close()
+                        timings.append((time.perf_counter() - began) * 1e6)
+                        statuses.add(response.status_code)
+                timings.sort()
+                self.stdout.write(
+                    f"{label:<14} {kind:<18} {'/'.join(map(str, sorted(statuses))):>6} "
+                    f"{statistics.mean(timings):>9.0f} {timings[int(len(timings) * 0.95) - 1]:>9.0f}"
+                )
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from api.metrics import MetricsMiddleware, registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what MetricsMiddleware adds to a request: calls a view directly and through the "
+        "middleware, for a view that runs no SQL and one that runs --queries trivial queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=10)
+
+    def handle(self, *args, **options):
+        def empty(request):
+            return HttpResponse()
+
+        def queries(request):
+            with connection.cursor() as cursor:
+                for _ in range(options['queries']):
+                    cursor.execute('SELECT 1')
+            return HttpResponse()
+
+        path = reverse('get_products')
+        request = RequestFactory().get(path)
+        request.resolver_match = resolve(path)
+        connection.ensure_connection()
+
+        self.stdout.write(f"{'view':<14} {'bare us':>9} {'metrics us':>11} {'overhead us':>12}")
+        for label, view in (("no queries", empty), (f"{options['queries']} queries", queries)):
+            bare = self.time(view, request, options['requests'])
+            instrumented = self.time(MetricsMiddleware(view), request, options['requests'])
+            self.stdout.write(f"{label:<14} {bare:>9.1f} {instrumented:>11.1f} {instrumented - bare:>12.1f}")
+        registry.reset()
+
+    def time(self, handler, request, count):
+        # Warm up, then take the best of three runs to damp scheduler noise
+        for _ in range(count // 10):
+            handler(request)
+        runs = []
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(count):
+                handler(request)
+            runs.append((time.perf_counter() - start) * 1e6 / count)
+        return min(runs)
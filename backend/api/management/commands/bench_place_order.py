@@ -0,0 +1,50 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Cart, CartItem, Customer, Product
+
+
+class Command(BaseCommand):
+    help = "Measure queries and latency of place_order for carts of different sizes. All data is rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100], help="Cart sizes to check out.")
+        parser.add_argument('--repeat', type=int, default=5, help="Checkouts per cart size.")
+
+    def handle(self, *args, **options):
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'), transaction.atomic():
+            self.run(options['sizes'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, sizes, repeat):
+        suffix = uuid.uuid4().hex[:8]
+        user = Customer.objects.create_user(f'bench-{suffix}', f'bench-{suffix}@example.com', 'bench')
+        products = Product.objects.bulk_create(
+            [Product(name=f"Bench product {i}", price=100 + i, category='others') for i in range(max(sizes))]
+        )
+        cart = Cart.objects.create(user=user)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = reverse('place_order')
+
+        self.stdout.write(f"{'items':>6} {'queries':>8} {'mean ms':>9} {'max ms':>9}")
+        for size in sizes:
+            timings, queries = [], set()
+            for _ in range(repeat):
+                CartItem.objects.bulk_create([CartItem(cart=cart, product=p, quantity=2) for p in products[:size]])
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = client.post(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 201:
+                    raise RuntimeError(f"place_order returned {response.status_code}: {response.data}")
+                queries.add(len(ctx.captured_queries))
+            self.stdout.write(
+                f"{size:>6} {'/'.join(map(str, sorted(queries))):>8} {sum(timings) / len(timings):>9.2f} {max(timings):>9.2f}"
+            )
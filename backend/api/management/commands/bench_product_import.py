@@ -0,0 +1,55 @@
+import random
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.imports import ProductImporter, csv_rows
+from api.models import Product
+from api.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a bulk CSV import of --rows new products, then re-importing them with new prices, "
+        "against creating products one at a time through ProductSerializer. All data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--legacy-rows', type=int, default=500, help="Products created one at a time.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        categories = [category for category, _ in Product.CATEGORY_CHOICES]
+        rows = [
+            {'sku': f'BENCH-{i:06d}', 'name': f'Bench product {i}', 'price': rng.randrange(100, 200000),
+             'category': rng.choice(categories)}
+            for i in range(options['rows'])
+        ]
+
+        self.stdout.write(f"{'run':<28} {'rows':>7} {'seconds':>8} {'rows/s':>9}")
+        with transaction.atomic():
+            start = time.perf_counter()
+            for row in rows[:options['legacy_rows']]:
+                serializer = ProductSerializer(data={**row, 'sku': 'ONE-' + row['sku']})
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+            self.report("one at a time", options['legacy_rows'], time.perf_counter() - start)
+
+            for label in ("bulk import (insert)", "bulk import (update)"):
+                body = self.csv(rows)
+                start = time.perf_counter()
+                importer = ProductImporter().run(csv_rows(BytesIO(body)))
+                self.report(label, importer.created + importer.updated, time.perf_counter() - start)
+                for row in rows:
+                    row['price'] += 1
+            transaction.set_rollback(True)
+
+    def csv(self, rows):
+        lines = ['sku,name,price,category'] + [f"{r['sku']},{r['name']},{r['price']},{r['category']}" for r in rows]
+        return ('\n'.join(lines) + '\n').encode()
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(f"{label:<28} {count:>7} {elapsed:>8.2f} {count / elapsed:>9.0f}")
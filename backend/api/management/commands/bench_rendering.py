@@ -0,0 +1,110 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+
+from api import projections
+from api.models import Cart, CartItem, Customer, OrderItem, Orders, Product
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import CartLineSerializer, OrderSerializer, ProductSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows/sec of rendering products, orders and cart lines through their ModelSerializers "
+        "and JSONRenderer with the .values() projections in api/projections.py, rendered by JSONRenderer "
+        "and by FastJSONRenderer. Each run includes its queries. All data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per path; the fastest is reported.")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write("orjson is not installed; FastJSONRenderer falls back to the stdlib json module")
+        with transaction.atomic():
+            self.run(options['rows'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, sizes, repeat):
+        started = time.perf_counter()
+        suffix = uuid.uuid4().hex[:8]
+        user = Customer.objects.create_user(f'bench-{suffix}', f'bench-{suffix}@example.com', 'bench')
+        products = Product.objects.bulk_create([
+            Product(
+                name=f"Bench render {i}", sku=f'bench-{suffix}-{i}', description="Rendering benchmark product.",
+                price=100 + i, category='others', image=f'bench/{i}.jpg',
+                image_variants={'source': f'bench/{i}.jpg', 'webp': {'320': f'bench/{i}-320.webp'}},
+            )
+            for i in range(max(sizes))
+        ], batch_size=2000)
+        orders = Orders.objects.bulk_create(
+            [Orders(user=user, total_amount=300) for _ in products], batch_size=2000
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem.for_product(product, order=order, quantity=quantity)
+            for order, product in zip(orders, products)
+            for quantity in (1, 2)
+        ], batch_size=2000)
+        cart = Cart.objects.create(user=user)
+        lines = CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product=product, quantity=2) for product in products], batch_size=2000
+        )
+        self.stdout.write(f"Created {max(sizes)} products, orders and cart lines in {time.perf_counter() - started:.1f}s")
+
+        self.stdout.write(f"{'case':<11} {'rows':>7} {'path':<22} {'best ms':>9} {'rows/s':>10} {'speedup':>8}")
+        for size in sizes:
+            product_rows = Product.objects.filter(pk__gte=products[0].pk, pk__lte=products[size - 1].pk)
+            order_rows = Orders.objects.filter(user=user, pk__lte=orders[size - 1].pk)
+            order_items = OrderItem.objects.filter(order__user=user, order_id__lte=orders[size - 1].pk)
+            cart_rows = (
+                CartItem.objects.filter(cart=cart, pk__lte=lines[size - 1].pk)
+                .select_related('product')
+                .annotate(line_total=F('quantity') * F('product__price'))
+                .order_by('id')
+            )
+            cases = {
+                'products': (
+                    lambda: ProductSerializer(product_rows, many=True).data,
+                    lambda: projections.products(product_rows.values(*projections.PRODUCT_FIELDS)),
+                ),
+                'orders': (
+                    lambda: OrderSerializer(OrderSerializer.setup_eager_loading(order_rows), many=True).data,
+                    lambda: projections.orders(
+                        projections.order_rows(order_rows), projections.order_item_rows(order_items)
+                    ),
+                ),
+                'cart lines': (
+                    lambda: CartLineSerializer(cart_rows, many=True).data,
+                    lambda: projections.cart_lines(projections.cart_line_rows(cart_rows)),
+                ),
+            }
+            for case, (serialized, projected) in cases.items():
+                self.compare(case, size, repeat, [
+                    ("serializer + json", lambda: JSONRenderer().render(serialized())),
+                    ("values + json", lambda: JSONRenderer().render(projected())),
+                    ("values + fast renderer", lambda: FastJSONRenderer().render(projected())),
+                ])
+
+    def compare(self, case, size, repeat, paths):
+        baseline = None
+        expected = None
+        for label, render in paths:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                body = render()
+                timings.append(time.perf_counter() - start)
+            if expected is None:
+                expected = body
+            elif body != expected:
+                raise CommandError(f"{case}: {label} rendered different JSON from the serializer")
+            best = min(timings)
+            baseline = baseline or best
+            self.stdout.write(
+                f"{case:<11} {size:>7} {label:<22} {best * 1000:>9.1f} {size / best:>10.0f} {baseline / best:>7.1f}x"
+            )
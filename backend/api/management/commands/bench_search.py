@@ -0,0 +1,91 @@
+import random
+import time
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Product
+from api.search import IcontainsProductSearch, get_search_backend
+
+WORDS = [
+    'pro', 'max', 'mini', 'air', 'ultra', 'plus', 'titanium', 'silver', 'graphite', 'midnight',
+    'starlight', 'wireless', 'charger', 'case', 'leather', 'silicone', 'band', 'sport', 'magsafe',
+    'retina', 'display', 'chip', 'battery', 'camera', 'keyboard', 'trackpad', 'pencil', 'cable',
+    'adapter', 'speaker', 'noise', 'cancelling', 'fitness', 'cellular', 'storage', 'portable',
+]
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'xe', 'zu', 'bri', 'dor', 'fen', 'gal', 'hux', 'jin']
+
+
+def build_vocabulary(rng, size):
+    """Product words plus made-up terms, with Zipf-like weights so a few words are common and most are rare."""
+    words = list(WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    return words, cum_weights
+
+
+class Command(BaseCommand):
+    help = "Compare indexed full-text product search against icontains scans on a generated catalog. All data is rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000, help="Size of the generated catalog.")
+        parser.add_argument('--queries', type=int, default=50, help="Searches timed per backend.")
+        parser.add_argument('--vocabulary', type=int, default=20_000, help="Distinct words in generated names and descriptions.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options['products'], options['queries'], options['vocabulary'], random.Random(options['seed']))
+            transaction.set_rollback(True)
+
+    def run(self, size, query_count, vocabulary_size, rng):
+        categories = [choice for choice, _ in Product.CATEGORY_CHOICES]
+        vocabulary, cum_weights = build_vocabulary(rng, vocabulary_size)
+        start = time.perf_counter()
+        Product.objects.bulk_create(
+            (
+                Product(
+                    name=' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=3)).title(),
+                    description=' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=40)),
+                    price=rng.randint(10, 3000),
+                    category=rng.choice(categories),
+                )
+                for _ in range(size)
+            ),
+            batch_size=2000,
+        )
+        indexed = get_search_backend()
+        indexed.rebuild()
+        self.stdout.write(f"Generated and indexed {size} products in {time.perf_counter() - start:.1f}s")
+
+        # Search for words customers would type: drawn from the middle of the
+        # distribution rather than the handful of near-universal terms.
+        queries = [' '.join(rng.sample(vocabulary[50:2000], rng.randint(1, 2))) for _ in range(query_count)]
+        baseline = self.time_backend(IcontainsProductSearch(), queries, prefix=False)
+        self.stdout.write(f"{'backend':<28} {'mean ms':>9} {'p95 ms':>9} {'speedup':>8}")
+        self.report('icontains', baseline, baseline)
+        self.report(type(indexed).__name__, self.time_backend(indexed, queries, prefix=False), baseline)
+        self.report(f"{type(indexed).__name__} prefix", self.time_backend(indexed, [q[:3] for q in queries], prefix=True), baseline)
+
+    def time_backend(self, backend, queries, prefix):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            results = backend.search(query, prefix=prefix)
+            # What one page of the search endpoint costs: the count plus the first 24 rows
+            results.count()
+            list(results[:24])
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
+
+    def report(self, label, timings, baseline):
+        mean = sum(timings) / len(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        speedup = (sum(baseline) / len(baseline)) / mean
+        self.stdout.write(f"{label:<28} {mean:>9.2f} {p95:>9.2f} {speedup:>7.1f}x")
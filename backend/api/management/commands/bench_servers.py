@@ -0,0 +1,130 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Cart, CartItem, Customer, Product
+
+# (label, application, gunicorn worker class)
+SERVERS = [
+    ("wsgi  gunicorn sync", 'backendecom.wsgi:application', 'sync'),
+    ("asgi  gunicorn uvicorn", 'backendecom.asgi:application', 'uvicorn.workers.UvicornWorker'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the app under gunicorn with sync (WSGI) and uvicorn (ASGI) workers in turn, open many "
+        "simultaneous connections to a few endpoints and report throughput and latency. Uses the "
+        "configured database; the data it creates is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000, help="Simultaneous connections per endpoint.")
+        parser.add_argument('--workers', type=int, default=3, help="gunicorn workers for each server.")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--path', action='append', dest='paths', help="Endpoint under /api/ to load; repeatable.")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['getProducts/', 'view-cart/', 'user-orders/']
+        run_id = uuid.uuid4().hex[:8]
+        user = Customer.objects.create(username=f'bench-{run_id}', email=f'bench-{run_id}@example.com', password='!')
+        products = Product.objects.bulk_create(
+            Product(name=f"Bench product {run_id} {i}", price=100 + i, category='others') for i in range(20)
+        )
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create(CartItem(cart=cart, product=product, quantity=1) for product in products[:5])
+        token = str(AccessToken.for_user(user))
+
+        self.stdout.write(f"{'server':<24} {'endpoint':<14} {'ok':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        try:
+            for label, application, worker_class in SERVERS:
+                with self.server(application, worker_class, options['workers'], options['port']):
+                    for path in paths:
+                        results, elapsed = asyncio.run(
+                            self.load(options['port'], f'/api/{path}', token, options['connections'])
+                        )
+                        self.report(label, path, results, elapsed)
+        finally:
+            Product.objects.filter(id__in=[product.id for product in products]).delete()
+            user.delete()
+
+    @contextmanager
+    def server(self, application, worker_class, workers, port):
+        env = dict(os.environ)
+        # Let backendecom.asgi decide; the WSGI run uses the DRF views
+        env.pop('ASYNC_VIEWS', None)
+        # Without SECRET_KEY in the environment each process picks a random one
+        env['SECRET_KEY'] = settings.SECRET_KEY
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', application, '-k', worker_class,
+             '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--backlog', '4096',
+             '--log-level', 'warning'],
+            env=env,
+        )
+        try:
+            self.wait_for_port(port, process)
+            yield
+        finally:
+            process.terminate()
+            process.wait()
+
+    def wait_for_port(self, port, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError("Server exited during startup")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                # Workers finish booting after the socket is bound
+                time.sleep(2)
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError("Server did not start")
+
+    async def load(self, port, path, token, connections):
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode()
+        start = asyncio.Event()
+        tasks = [asyncio.create_task(self.fetch(port, request, start)) for _ in range(connections)]
+        began = time.perf_counter()
+        start.set()
+        results = await asyncio.gather(*tasks)
+        return results, time.perf_counter() - began
+
+    async def fetch(self, port, request, start):
+        await start.wait()
+        began = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), 60)
+            writer.write(request)
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), 60)
+            await asyncio.wait_for(reader.read(), 60)
+            writer.close()
+            ok = status_line.split()[1] == b'200'
+        except (OSError, asyncio.TimeoutError, IndexError):
+            ok = False
+        return ok, (time.perf_counter() - began) * 1000
+
+    def report(self, label, path, results, elapsed):
+        latencies = sorted(latency for ok, latency in results if ok)
+        ok = len(latencies)
+        if not latencies:
+            latencies = [0]
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+        self.stdout.write(
+            f"{label:<24} {path:<14} {ok:>6} {len(results) - ok:>6} {ok / elapsed:>8.0f} {p50:>8.1f} {p99:>8.1f}"
+        )
@@ -0,0 +1,165 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import benchdata
+from api.cache import catalog_cache
+from api.models import Orders, Product
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the real API routes through a shopper flow (browse, add to cart, view cart, place order, "
+        "order history) and the admin listings, against data from generate_bench_data, and report "
+        "p50/p95/p99 latency, throughput and queries per request for each step. Orders and carts "
+        "created by the run are rolled back. --save-baseline writes the results as JSON; --baseline "
+        "compares a run with such a file and fails on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flows', type=int, default=100, help="Shopper flows to run.")
+        parser.add_argument('--warmup', type=int, default=5, help="Flows run first and not measured.")
+        parser.add_argument('--seed', type=int, default=0, help="Picks the shoppers, products and searches.")
+        parser.add_argument('--save-baseline', metavar='PATH')
+        parser.add_argument('--baseline', metavar='PATH')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help="Allowed p95 slowdown against the baseline, as a fraction (default 0.2).",
+        )
+
+    def handle(self, *args, **options):
+        shoppers = list(benchdata.bench_customers().filter(is_staff=False).order_by('id')[:1000])
+        staff = benchdata.bench_customers().filter(is_staff=True).first()
+        products = list(
+            benchdata.bench_products().exclude(stock=0).order_by('id').values_list('id', 'category', 'name')[:1000]
+        )
+        if not (shoppers and staff and products):
+            raise CommandError("No generated data; run generate_bench_data first")
+
+        self.rng = random.Random(options['seed'])
+        self.samples = {}
+        catalog_cache.reset()
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            with transaction.atomic():
+                admin = self.client_for(staff)
+                for _ in range(options['warmup']):
+                    self.flow(self.client_for(self.rng.choice(shoppers)), admin, products)
+                self.samples = {}
+                started = time.perf_counter()
+                for _ in range(options['flows']):
+                    self.flow(self.client_for(self.rng.choice(shoppers)), admin, products)
+                elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+
+        results = self.summarize()
+        self.report(results, elapsed)
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump({'meta': self.meta(options), 'steps': results}, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved baseline to {options['save_baseline']}")
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def request(self, step, client, method, url, expected=200, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            began = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            latency = time.perf_counter() - began
+        self.samples.setdefault(step, []).append((latency, len(queries), response.status_code == expected))
+        return response
+
+    def flow(self, shopper, admin, products):
+        product_id, category, name = self.rng.choice(products)
+        self.request('browse: all products', shopper, 'get', reverse('get_products'))
+        self.request('browse: catalog page', shopper, 'get', reverse('product_catalog'), data={'category': category})
+        self.request('browse: search', shopper, 'get', reverse('product_search'), data={'q': name.split()[1]})
+        self.request('browse: product', shopper, 'get', reverse('get_single_product', args=[product_id]))
+        for cart_product_id, _, _ in self.rng.sample(products, min(2, len(products))):
+            self.request(
+                'add-to-cart', shopper, 'post', reverse('add_to_cart'), expected=201,
+                data={'product_id': cart_product_id, 'quantity': self.rng.randint(1, 2)}, format='json',
+            )
+        self.request('view-cart', shopper, 'get', reverse('view_cart'))
+        self.request('place-order', shopper, 'post', reverse('place_order'), expected=201)
+        self.request('order history', shopper, 'get', reverse('user_orders'))
+
+        self.request('admin: customers', admin, 'get', reverse('customer_list'))
+        self.request('admin: orders', admin, 'get', reverse('all_orders'))
+        self.request('admin: stats', admin, 'get', reverse('admin_stats'))
+        self.request('admin: products', admin, 'get', reverse('product_list_create'))
+
+    def summarize(self):
+        results = {}
+        for step, samples in self.samples.items():
+            latencies = sorted(latency for latency, _, _ in samples)
+            results[step] = {
+                'requests': len(samples),
+                'errors': sum(not ok for _, _, ok in samples),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+                'requests_per_second': round(len(latencies) / sum(latencies), 1),
+                'queries': round(sum(count for _, count, _ in samples) / len(samples), 2),
+            }
+        return results
+
+    def meta(self, options):
+        return {
+            'database': connection.vendor,
+            'customers': benchdata.bench_customers().count(),
+            'products': Product.objects.count(),
+            'orders': Orders.objects.count(),
+            'flows': options['flows'],
+            'seed': options['seed'],
+        }
+
+    def report(self, results, elapsed):
+        self.stdout.write(
+            f"{'step':<22} {'reqs':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>8}"
+        )
+        for step, r in results.items():
+            self.stdout.write(
+                f"{step:<22} {r['requests']:>6} {r['errors']:>6} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                f"{r['p99_ms']:>8.2f} {r['requests_per_second']:>8.1f} {r['queries']:>8.2f}"
+            )
+        total = sum(r['requests'] for r in results.values())
+        self.stdout.write(f"{total} requests in {elapsed:.1f}s, {total / elapsed:.1f} req/s overall")
+
+    def compare(self, results, path, tolerance):
+        with open(path) as f:
+            baseline = json.load(f)['steps']
+        self.stdout.write(f"\nAgainst {path}:")
+        self.stdout.write(f"{'step':<22} {'base p95':>9} {'p95':>9} {'change':>8} {'base q':>7} {'queries':>8}")
+        regressions = []
+        for step, r in results.items():
+            base = baseline.get(step)
+            if base is None:
+                continue
+            change = r['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0
+            slower = change > tolerance
+            more_queries = r['queries'] > base['queries'] + 0.5
+            if slower or more_queries or r['errors'] > base['errors']:
+                regressions.append(step)
+            self.stdout.write(
+                f"{step:<22} {base['p95_ms']:>9.2f} {r['p95_ms']:>9.2f} {change:>+8.0%} {base['queries']:>7.2f} "
+                f"{r['queries']:>8.2f}{'  REGRESSION' if step in regressions else ''}"
+            )
+        if regressions:
+            raise CommandError(f"Regressed against the baseline: {', '.join(regressions)}")
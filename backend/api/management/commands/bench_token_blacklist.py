@@ -0,0 +1,91 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from api.tokens import BlacklistCache, prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare database blacklist checks against the in-memory JTI cache on a synthetic token table, "
+        "then time pruning it. All data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=10_000_000, help="Outstanding tokens to generate.")
+        parser.add_argument('--blacklisted', type=float, default=0.2, help="Fraction of tokens that are blacklisted.")
+        parser.add_argument('--expired', type=float, default=0.9, help="Fraction of tokens that have expired.")
+        parser.add_argument('--checks', type=int, default=5000, help="Blacklist checks timed per method.")
+        parser.add_argument('--batch-size', type=int, default=10000, help="Batch size for generating and pruning.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options, random.Random(options['seed']))
+            transaction.set_rollback(True)
+
+    def run(self, options, rng):
+        size, batch_size = options['tokens'], options['batch_size']
+        now = timezone.now()
+        start = time.perf_counter()
+        for offset in range(0, size, batch_size):
+            batch = []
+            for i in range(offset, min(offset + batch_size, size)):
+                # Tokens were issued in order, so the oldest ones are the expired ones
+                expired = i < size * options['expired']
+                batch.append(OutstandingToken(
+                    jti=uuid.uuid4().hex,
+                    # A stand-in for the encoded JWT; only its size matters here
+                    token='x' * 230,
+                    created_at=now - timedelta(days=2),
+                    expires_at=now - timedelta(hours=1) if expired else now + timedelta(hours=12),
+                ))
+            created = OutstandingToken.objects.bulk_create(batch)
+            BlacklistedToken.objects.bulk_create(
+                BlacklistedToken(token=token) for token in created if rng.random() < options['blacklisted']
+            )
+        self.stdout.write(f"Generated {size} tokens in {time.perf_counter() - start:.1f}s")
+
+        # Unexpired tokens, as a refresh or logout would present
+        live = list(
+            OutstandingToken.objects.filter(expires_at__gt=now).order_by('-id').values_list('jti', flat=True)[:options['checks'] * 4]
+        )
+        checks = rng.sample(live, min(options['checks'], len(live)))
+
+        start = time.perf_counter()
+        cache = BlacklistCache()
+        cache.sync()
+        self.stdout.write(f"Loaded {len(cache)} live blacklisted JTIs into the cache in {time.perf_counter() - start:.2f}s")
+
+        self.stdout.write(f"{'check':<12} {'mean us':>10} {'p99 us':>10}")
+        self.report('database', self.time_checks(
+            checks, lambda jti: BlacklistedToken.objects.filter(token__jti=jti).exists()
+        ))
+        self.report('cache', self.time_checks(checks, lambda jti: jti in cache))
+
+        start = time.perf_counter()
+        deleted = prune_expired_tokens(batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Pruned {deleted} expired tokens in {elapsed:.1f}s, "
+            f"{OutstandingToken.objects.count()} outstanding and {BlacklistedToken.objects.count()} blacklisted left"
+        )
+
+    def time_checks(self, jtis, check):
+        timings = []
+        for jti in jtis:
+            start = time.perf_counter()
+            check(jti)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+        return sorted(timings)
+
+    def report(self, label, timings):
+        mean = sum(timings) / len(timings)
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        self.stdout.write(f"{label:<12} {mean:>10.1f} {p99:>10.1f}")
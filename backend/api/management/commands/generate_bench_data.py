@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchdata
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with reproducible synthetic customers, products and historic "
+        "orders for bench_storefront. All rows are prefixed 'bench' and removed by --clear."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--clear', action='store_true', help="Delete previously generated data and exit.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            benchdata.clear()
+            self.stdout.write("Removed generated data")
+            return
+        if benchdata.bench_customers().exists():
+            raise CommandError("Generated data already exists; run with --clear first")
+        benchdata.generate(
+            options['customers'], options['products'], options['orders'], seed=options['seed'], stdout=self.stdout
+        )
+        self.stdout.write(f"Generated data with seed {options['seed']}; password for every user: {benchdata.PASSWORD}")
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.models import Customer, Product
+from api.signals import generate_product_variants, generate_profile_picture_variants
+
+# (model, image field, job that builds and stores its variants)
+IMAGE_FIELDS = [
+    (Product, 'image', generate_product_variants),
+    (Customer, 'profile_picture', generate_profile_picture_variants),
+]
+
+
+def threaded(func):
+    """Wrap `func` to close the worker thread's database connection after each call."""
+    def wrapper(*args):
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+class Command(BaseCommand):
+    help = "Build resized and WebP variants for existing product images and profile pictures."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Images processed in parallel.")
+        parser.add_argument('--force', action='store_true', help="Rebuild variants that are already up to date.")
+
+    def handle(self, *args, **options):
+        for model, field, job in IMAGE_FIELDS:
+            pks = list(
+                model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''}).values_list('pk', flat=True)
+            )
+
+            def generate(pk):
+                try:
+                    return job(pk, force=options['force'])
+                except Exception as e:
+                    self.stderr.write(f"{model.__name__} {pk}: {e}")
+                    return False
+
+            if options['workers'] > 1:
+                with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                    built = sum(pool.map(threaded(generate), pks))
+            else:
+                built = sum(map(generate, pks))
+            self.stdout.write(f"{model.__name__}: built variants for {built} of {len(pks)} images")
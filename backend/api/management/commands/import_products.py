@@ -0,0 +1,46 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.exceptions import ParseError
+
+from api import imports
+
+READERS = {'csv': imports.csv_rows, 'ndjson': imports.ndjson_rows}
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update products by SKU from a CSV file (with a header row) or a JSON-lines file, "
+        "in chunks. Rejected rows are listed with their line number; the rest are imported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin.")
+        parser.add_argument('--format', choices=sorted(READERS), help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=imports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if import_format in ('jsonl', 'json'):
+            import_format = 'ndjson'
+        if import_format not in READERS:
+            raise CommandError("Cannot tell the format from the file name; pass --format")
+
+        stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        try:
+            importer = imports.ProductImporter(options['chunk_size']).run(READERS[import_format](stream))
+        except ParseError as e:
+            raise CommandError(e.detail)
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+        for error in importer.errors:
+            self.stderr.write(f"line {error['line']} ({error['sku'] or 'no sku'}): {json.dumps(error['errors'])}")
+        summary = f"{importer.created} created, {importer.updated} updated, {importer.error_count} rows rejected"
+        if importer.superseded_count:
+            summary += f", {importer.superseded_count} superseded by a later row with the same SKU"
+        self.stdout.write(summary)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.tokens import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding JWTs and their blacklist entries in batches. "
+        "Run it from a scheduler (e.g. daily), or keep it running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help="Token ids covered by each delete.")
+        parser.add_argument('--loop', action='store_true', help="Keep pruning instead of exiting after one pass.")
+        parser.add_argument('--interval', type=float, default=3600, help="Seconds to sleep between passes with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = prune_expired_tokens(batch_size=options['batch_size'])
+            self.stdout.write(f"Pruned {deleted} expired tokens")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
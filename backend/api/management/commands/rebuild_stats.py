@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.stats import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily order and category rollups behind admin/stats/ from the orders tables."
+
+    def handle(self, *args, **options):
+        rebuild_rollups()
+        self.stdout.write("Rebuilt dashboard rollups")
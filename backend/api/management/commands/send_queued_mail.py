@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.mail import process_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued outbound emails, retrying failures with exponential backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Emails claimed per batch.")
+        parser.add_argument('--workers', type=int, default=4, help="Sending threads, each with one mail connection.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox instead of exiting once it is drained.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_outbox(batch_size=options['batch_size'], workers=options['workers'])
+            if processed:
+                self.stdout.write(f"Processed {processed} emails")
+            elif options['loop']:
+                time.sleep(options['interval'])
+            else:
+                break
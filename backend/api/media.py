@@ -0,0 +1,223 @@
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+# Names produced by api.images, e.g. variants/phone-300w-0123456789abcdef.webp
+HASHED_NAME_RE = re.compile(r'-[0-9a-f]{16}\.\w+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Pre-compressed siblings served to clients that accept them, best first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+CHUNK_SIZE = 64 * 1024
+
+MediaFile = namedtuple('MediaFile', ['path', 'size', 'mtime', 'etag', 'content_type', 'encoded'])
+
+
+def stat_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def media_file(path, stat):
+    content_type, _ = mimetypes.guess_type(path)
+    return MediaFile(
+        path=path,
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        etag=stat_etag(stat),
+        content_type=content_type or 'application/octet-stream',
+        encoded={},
+    )
+
+
+class MediaIndex:
+    """
+    In-memory map of every file under MEDIA_ROOT with its path, ETag and
+    compressed siblings, so serving a file needs no directory lookups. Built
+    on first use; files uploaded later are indexed when first requested.
+    serve_media checks each entry against the file it opens, see revalidate().
+    """
+    def __init__(self):
+        self._files = None
+        self._root = None
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._files = None
+
+    def build(self, root):
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                files[os.path.relpath(path, root).replace(os.sep, '/')] = media_file(path, os.stat(path))
+        # Attach compressed siblings to the file they compress
+        for name, entry in files.items():
+            for encoding, suffix in ENCODINGS:
+                if name + suffix in files:
+                    entry.encoded[encoding] = files[name + suffix]
+        return files
+
+    def get(self, name):
+        root = settings.MEDIA_ROOT
+        if self._files is None or self._root != root:
+            files = self.build(root) if os.path.isdir(root) else {}
+            with self._lock:
+                self._files, self._root = files, root
+        entry = self._files.get(name)
+        if entry is None:
+            # Uploaded since the index was built, or not there at all
+            try:
+                path = safe_join(root, name)
+                if not os.path.isfile(path):
+                    return None
+                entry = media_file(path, os.stat(path))
+            except (OSError, SuspiciousFileOperation):
+                return None
+            with self._lock:
+                self._files[name] = entry
+        return entry
+
+    def revalidate(self, name, entry, stat):
+        """
+        Return `entry`, or a fresh one when `stat` of the opened file shows
+        it was replaced since it was indexed, e.g. re-uploaded under the same
+        name or changed by another worker.
+        """
+        if stat_etag(stat) == entry.etag:
+            return entry
+        fresh = media_file(entry.path, stat)
+        for encoding, suffix in ENCODINGS:
+            try:
+                sibling = os.stat(entry.path + suffix)
+            except OSError:
+                continue
+            # An older sibling compresses the previous content
+            if sibling.st_mtime_ns >= stat.st_mtime_ns:
+                fresh.encoded[encoding] = media_file(entry.path + suffix, sibling)
+        with self._lock:
+            if self._files is not None:
+                self._files[name] = fresh
+        return fresh
+
+    def discard(self, name):
+        with self._lock:
+            if self._files is not None:
+                self._files.pop(name, None)
+
+
+media_index = MediaIndex()
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) for a single-range `Range: bytes=...` header, None
+    to serve the whole file, or False if the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def read_range(f, start, length):
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def cache_headers(response, entry, name):
+    response['ETag'] = entry.etag
+    response['Last-Modified'] = http_date(entry.mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if HASHED_NAME_RE.search(name):
+        # The name changes whenever the content does
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_MAX_AGE}'
+    if entry.encoded:
+        response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve an uploaded file from MEDIA_ROOT with validators and cache headers,
+    answering conditional requests with 304 and Range requests with 206.
+    Whole files go out through FileResponse, which lets the server use
+    sendfile().
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    entry = media_index.get(name)
+    if entry is None:
+        raise Http404("Media file not found")
+    try:
+        f = open(entry.path, 'rb')
+    except OSError:
+        media_index.discard(name)
+        raise Http404("Media file not found")
+    # Validators and sizes come from the file actually opened, not the index
+    entry = media_index.revalidate(name, entry, os.fstat(f.fileno()))
+
+    conditional = get_conditional_response(request, etag=entry.etag, last_modified=int(entry.mtime))
+    if conditional is not None:
+        # 304 Not Modified, or 412 for a failed If-Match
+        f.close()
+        return cache_headers(conditional, entry, name)
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if 'Range' in request.headers and (if_range is None or if_range == entry.etag):
+        byte_range = parse_range(request.headers['Range'], entry.size)
+    if byte_range is False:
+        f.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{entry.size}'
+        return cache_headers(response, entry, name)
+
+    if byte_range is not None:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(f, start, end - start + 1), status=206, content_type=entry.content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{entry.size}'
+        return cache_headers(response, entry, name)
+
+    accepted = request.headers.get('Accept-Encoding', '')
+    encoding = next((e for e, _ in ENCODINGS if e in entry.encoded and e in accepted), None)
+    if encoding:
+        try:
+            encoded = open(entry.encoded[encoding].path, 'rb')
+        except OSError:
+            # Removed since it was indexed; send the file itself
+            encoding = None
+        else:
+            f.close()
+            f = encoded
+    # FileResponse sets Content-Length from the open file
+    response = FileResponse(f, content_type=entry.content_type, filename=os.path.basename(entry.path))
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return cache_headers(response, entry, name)
@@ -0,0 +1,251 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# The RequestMetrics of the request being handled, if any. A context variable
+# rather than a thread-local so queries run through sync_to_async from the
+# async views are counted against their request too.
+current_request = ContextVar('current_request', default=None)
+
+
+class Histogram:
+    """Cumulative Prometheus histogram per label tuple. Callers hold the registry lock."""
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def expose(self, label_names, extra):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            base = format_labels(label_names, labels, extra)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {total}')
+            lines.append(f'{self.name}_count{{{base}}} {count}')
+        return lines
+
+
+def format_labels(names, values, extra=''):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+    return f'{pairs},{extra}' if extra else pairs
+
+
+class MetricsRegistry:
+    """
+    Per-process request metrics, keyed by URL route and method. Every gunicorn
+    worker keeps its own; the `pid` label keeps their counters apart so
+    Prometheus can sum rates across whichever worker answers each scrape.
+    """
+    label_names = ('route', 'method')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()
+            self.duration = Histogram(
+                'http_request_duration_seconds', "Time from the first middleware to the response.", DURATION_BUCKETS
+            )
+            self.db = Histogram('http_request_db_seconds', "Time spent running SQL per request.", DURATION_BUCKETS)
+            self.render = Histogram(
+                'http_request_render_seconds', "Time spent serializing the response body.", DURATION_BUCKETS
+            )
+            self.queries = Histogram('http_request_queries', "SQL queries run per request.", QUERY_BUCKETS)
+
+    def record(self, route, method, status, metrics, duration):
+        labels = (route, method)
+        with self._lock:
+            self.requests[(route, method, status)] += 1
+            self.duration.observe(labels, duration)
+            self.db.observe(labels, metrics.db_time)
+            self.render.observe(labels, metrics.render_time)
+            self.queries.observe(labels, metrics.queries)
+
+    def expose(self):
+        pid = f'pid="{os.getpid()}"'
+        with self._lock:
+            lines = ['# HELP http_requests_total Requests handled.', '# TYPE http_requests_total counter']
+            for labels, count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{{format_labels(self.label_names + ("status",), labels, pid)}}} {count}')
+            for histogram in (self.duration, self.db, self.render, self.queries):
+                lines.extend(histogram.expose(self.label_names, pid))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'render_time', 'render_started', 'sql')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.render_started = None
+        # (sql, seconds) of every query, only kept for the slow request log
+        self.sql = []
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.queries += 1
+        metrics.db_time += elapsed
+        metrics.sql.append((sql, elapsed))
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+def request_route(request):
+    match = getattr(request, 'resolver_match', None)
+    # The pattern, not the path, so /api/product/7/ and /api/product/8/ share a series
+    return f'/{match.route}' if match else '<unmatched>'
+
+
+def log_slow_request(request, route, status, metrics, duration):
+    entry = {
+        'event': 'slow_request',
+        'route': route,
+        'path': request.path,
+        'method': request.method,
+        'status': status,
+        'duration_ms': round(duration * 1000, 2),
+        'db_ms': round(metrics.db_time * 1000, 2),
+        'render_ms': round(metrics.render_time * 1000, 2),
+        'queries': metrics.queries,
+        # The same statement run many times is usually an N+1
+        'duplicate_queries': metrics.queries - len({sql for sql, _ in metrics.sql}),
+    }
+    threshold = settings.METRICS_SLOW_QUERY_MS / 1000
+    entry['slow_queries'] = [
+        {'sql': sql, 'ms': round(elapsed * 1000, 2)} for sql, elapsed in metrics.sql if elapsed >= threshold
+    ]
+    logger.warning(json.dumps(entry))
+
+
+class MetricsMiddleware:
+    """
+    Record each request's latency, SQL query count and time, and response
+    rendering time into `registry`, and log a JSON line for requests slower
+    than METRICS_SLOW_REQUEST_MS. Goes first in MIDDLEWARE so the latency
+    covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connections opened before this module was imported
+        for alias in connections:
+            instrument(connections[alias])
+        metrics, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def start(self):
+        metrics = RequestMetrics()
+        return metrics, current_request.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, started):
+        duration = time.perf_counter() - started
+        if request.path == settings.METRICS_PATH:
+            return response
+        route = request_route(request)
+        registry.record(route, request.method, response.status_code, metrics, duration)
+        if duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            log_slow_request(request, route, response.status_code, metrics, duration)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step
+        metrics = current_request.get()
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: self.rendered(metrics))
+        return response
+
+    def rendered(self, metrics):
+        metrics.render_time = time.perf_counter() - metrics.render_started
+
+
+@require_safe
+def metrics_view(request):
+    """
+    Prometheus text exposition of `registry`, behind METRICS_TOKEN. Without
+    a token it is only served when DEBUG is on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        raise Http404
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
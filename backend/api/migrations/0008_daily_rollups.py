@@ -0,0 +1,64 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:20
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Orders = apps.get_model('api', 'Orders')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    DailyOrderRollup = apps.get_model('api', 'DailyOrderRollup')
+    DailyCategoryRollup = apps.get_model('api', 'DailyCategoryRollup')
+
+    DailyOrderRollup.objects.bulk_create(
+        DailyOrderRollup(date=row['date'], shipping_status=row['shipping_status'], orders=row['orders'], revenue=row['revenue'])
+        for row in Orders.objects.annotate(date=TruncDate('created_at'))
+        .values('date', 'shipping_status')
+        .annotate(orders=Count('id'), revenue=Sum('total_amount'))
+    )
+    DailyCategoryRollup.objects.bulk_create(
+        DailyCategoryRollup(date=row['date'], category=row['product__category'] or '', units=row['units'], revenue=row['revenue'] or 0)
+        for row in OrderItem.objects.annotate(date=TruncDate('order__created_at'))
+        .values('date', 'product__category')
+        .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('price')))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(blank=True, choices=[('macbook', 'MacBook'), ('iphone', 'iPhone'), ('ipad', 'iPad'), ('watch', 'Watch'), ('airpods', 'AirPods'), ('tvandhome', 'TvAndHome'), ('others', 'Others')], max_length=50)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyOrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('shipping_status', models.CharField(choices=[('pending', 'Pending'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategoryrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'category'), name='unique_daily_category_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyorderrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'shipping_status'), name='unique_daily_order_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:51
+
+from django.db import migrations, models
+
+# Indexes for CustomerSearchFilter's case-insensitive prefix search. They match
+# what istartswith compiles to: UPPER("column"::text) LIKE 'TERM%' on
+# PostgreSQL, and a LIKE that SQLite can only run as an index range scan on a
+# NOCASE index.
+SEARCH_COLUMNS = ['username', 'customer_name', 'email', 'phone_number']
+SEARCH_INDEXES = {
+    'postgresql': "CREATE INDEX customer_{column}_prefix_idx ON api_customer (UPPER({column}::text) text_pattern_ops)",
+    'sqlite': "CREATE INDEX customer_{column}_prefix_idx ON api_customer ({column} COLLATE NOCASE)",
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    statement = SEARCH_INDEXES.get(schema_editor.connection.vendor)
+    if statement:
+        for column in SEARCH_COLUMNS:
+            schema_editor.execute(statement.format(column=column))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in SEARCH_INDEXES:
+        for column in SEARCH_COLUMNS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS customer_{column}_prefix_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_image_variants'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['city', 'id'], name='customer_city_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['state', 'id'], name='customer_state_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('is_staff', True)), fields=['id'], name='customer_staff_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
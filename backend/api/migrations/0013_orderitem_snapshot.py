@@ -0,0 +1,68 @@
+# Generated by Django 5.0.3 on 2026-10-18 21:08
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 10000
+
+
+def backfill_snapshots(apps, schema_editor):
+    """
+    Copy each existing line's product name, image, category and description,
+    and its price where none was stored, one id range at a time to keep
+    transactions short.
+    """
+    OrderItem = apps.get_model('api', 'OrderItem')
+    Product = apps.get_model('api', 'Product')
+    product = Product.objects.filter(pk=OuterRef('product_id'))
+    last_id = OrderItem.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        lines = OrderItem.objects.filter(id__gte=start, id__lt=start + BATCH_SIZE)
+        with transaction.atomic():
+            lines.update(
+                product_name=Coalesce(Subquery(product.values('name')[:1]), Value('')),
+                product_image=Coalesce(Subquery(product.values('image')[:1]), Value('')),
+                product_category=Coalesce(Subquery(product.values('category')[:1]), Value('')),
+                product_description=Subquery(product.values('description')[:1]),
+            )
+            lines.filter(price__isnull=True).update(price=Subquery(product.values('price')[:1]))
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch instead of in one migration-wide transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_category',
+            field=models.CharField(blank=True, choices=[('macbook', 'MacBook'), ('iphone', 'iPhone'), ('ipad', 'iPad'), ('watch', 'Watch'), ('airpods', 'AirPods'), ('tvandhome', 'TvAndHome'), ('others', 'Others')], default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='product',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.product'),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin, User
 from django.contrib.auth import get_user_model
 
@@ -15,11 +18,25 @@ class Product(models.Model):
     ]
 
     name = models.CharField(max_length=150, null=True, blank=True)
+    # Stable external key that bulk imports match products on (see api/imports.py)
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
     image = models.ImageField(null=True, blank=True)
+    # Resized and WebP copies of `image`, built in the background (see api/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     price = models.IntegerField(null=True, blank=True)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, null=True, blank=True)
     id = models.AutoField(primary_key=True, editable=False)
+    # Units on hand; NULL means stock is not tracked for this product
+    stock = models.PositiveIntegerField(null=True, blank=True)
+    # Weighted full-text vector, maintained by api.search on PostgreSQL only
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves the category-filtered, id-ordered catalog pages
+            models.Index(fields=['category', 'id'], name='product_category_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -66,6 +83,7 @@ class Customer(AbstractBaseUser, PermissionsMixin):
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=100)
     profile_picture = models.ImageField(upload_to='profile_pictures/', null=True, blank=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
@@ -78,6 +96,14 @@ class Customer(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['customer_name', 'email', 'phone_number', 'address', 'city', 'state']
 
+    class Meta:
+        indexes = [
+            # Admin directory filters, newest first within each
+            models.Index(fields=['city', 'id'], name='customer_city_id_idx'),
+            models.Index(fields=['state', 'id'], name='customer_state_id_idx'),
+            models.Index(fields=['id'], condition=models.Q(is_staff=True), name='customer_staff_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -98,6 +124,11 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+
 class Orders(models.Model):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     items = models.ManyToManyField(Product, through='OrderItem')
@@ -111,11 +142,101 @@ class Orders(models.Model):
     ]
     shipping_status = models.CharField(max_length=20, choices=SHIPPING_STATUS_CHOICES, default='pending')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['shipping_status', 'created_at'], name='orders_status_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='orders_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.id} by {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        # api.signals locks the row before moving stock; hold that lock until
+        # the new status is written
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Orders, on_delete=models.CASCADE)
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Kept as a link only; deleting the product leaves the line and its snapshot
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
     quantity = models.PositiveIntegerField(default=1)
-    price = models.DecimalField(max_digits=10, decimal_places=2, null=True) # Add price field
\ No newline at end of file
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True) # Unit price at purchase
+    # The product as it was at checkout, so order history never reads Product
+    product_name = models.CharField(max_length=150, blank=True, default='')
+    product_image = models.CharField(max_length=100, blank=True, default='')
+    product_category = models.CharField(max_length=50, choices=Product.CATEGORY_CHOICES, blank=True, default='')
+    product_description = models.TextField(null=True, blank=True)
+
+    @classmethod
+    def for_product(cls, product, **kwargs):
+        """An unsaved line for `product` with its current name, price, image, category and description."""
+        return cls(
+            product=product,
+            price=product.price,
+            product_name=product.name or '',
+            product_image=product.image.name or '',
+            product_category=product.category or '',
+            product_description=product.description,
+            **kwargs,
+        )
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, null=True, blank=True)
+    recipients = models.JSONField(default=list)
+    html_template = models.CharField(max_length=255, blank=True)
+    context = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)}"
+
+class DailyOrderRollup(models.Model):
+    """
+    Orders and revenue per day and shipping status, kept current by
+    api.stats so the dashboard never has to scan the orders table.
+    """
+    date = models.DateField()
+    shipping_status = models.CharField(max_length=20, choices=Orders.SHIPPING_STATUS_CHOICES)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'shipping_status'], name='unique_daily_order_rollup'),
+        ]
+
+class DailyCategoryRollup(models.Model):
+    """
+    Units sold and revenue per day and product category. Uncategorized
+    products are counted under ''.
+    """
+    date = models.DateField()
+    category = models.CharField(max_length=50, choices=Product.CATEGORY_CHOICES, blank=True)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='unique_daily_category_rollup'),
+        ]
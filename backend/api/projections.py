@@ -0,0 +1,148 @@
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+from .images import variant_urls
+
+# Plain-dict versions of the serializers behind the hot read endpoints. They
+# build the same data from .values() rows, without model instances or
+# per-row field objects. The tests check both give identical output.
+
+# Formatted as the serializers' DecimalField and DateTimeField would
+decimal_string = serializers.DecimalField(max_digits=10, decimal_places=2).to_representation
+datetime_string = serializers.DateTimeField().to_representation
+
+# ProductSerializer
+PRODUCT_FIELDS = ['id', 'sku', 'name', 'description', 'image', 'image_variants', 'price', 'category']
+# OrderSerializer and OrderItemSerializer
+ORDER_FIELDS = ['id', 'user__username', 'total_amount', 'created_at', 'shipping_status']
+ORDER_ITEM_FIELDS = ['order_id', 'product_id', 'product_name', 'product_image', 'product_category', 'product_description', 'quantity', 'price']
+# CartLineSerializer and CompactCartLineSerializer, over views.cart_lines()
+CART_LINE_FIELDS = ['id', 'quantity', 'line_total'] + [f'product__{name}' for name in PRODUCT_FIELDS]
+COMPACT_CART_LINE_FIELDS = ['id', 'quantity', 'line_total', 'product__id', 'product__name', 'product__price', 'product__image']
+
+PRODUCT_COLUMNS = [(name, name) for name in PRODUCT_FIELDS]
+CART_PRODUCT_COLUMNS = [(name, f'product__{name}') for name in PRODUCT_FIELDS]
+
+
+class MediaURLs:
+    """
+    URLs for stored file names, absolute when there is a request like
+    ImageField makes them. With FileSystemStorage a plain relative name is
+    appended to a prefix worked out once per response, which is what
+    storage.url() and build_absolute_uri() would give without their URL
+    parsing. Each name is only resolved once per response.
+    """
+    def __init__(self, request=None):
+        self.request = request
+        self.urls = {}
+        self.prefix = None
+        if default_storage.__class__.url is FileSystemStorage.url:
+            self.prefix = default_storage.base_url
+            if request is not None:
+                self.prefix = request.build_absolute_uri(self.prefix)
+
+    def __call__(self, name):
+        if not name:
+            return None
+        url = self.urls.get(name)
+        if url is None:
+            url = self.resolve(name)
+            self.urls[name] = url
+        return url
+
+    def resolve(self, name):
+        path = filepath_to_uri(name).lstrip('/')
+        # Dot segments and empty segments, which urljoin() collapses, go the long way
+        if self.prefix is not None and '/.' not in '/' + path and '//' not in path:
+            return self.prefix + path
+        url = default_storage.url(name)
+        return self.request.build_absolute_uri(url) if self.request is not None else url
+
+
+def product_dict(row, urls, columns=PRODUCT_COLUMNS):
+    product = {name: row[column] for name, column in columns}
+    product['image'] = urls(product['image'])
+    product['image_variants'] = variant_urls(product['image_variants'], urls)
+    return product
+
+
+def products(rows, request=None):
+    """ProductSerializer(many=True).data for rows of .values(*PRODUCT_FIELDS)."""
+    urls = MediaURLs(request)
+    return [product_dict(row, urls) for row in rows]
+
+
+def order_rows(queryset):
+    # Eager loading set up for the serializer has no use here
+    return queryset.prefetch_related(None).values(*ORDER_FIELDS)
+
+
+def order_item_rows(queryset):
+    return queryset.order_by('id').values(*ORDER_ITEM_FIELDS)
+
+
+def orders(rows, item_rows, request=None):
+    """
+    OrderSerializer(many=True).data for order_rows(), given the
+    order_item_rows() of those orders.
+    """
+    urls = MediaURLs(request)
+    items = {}
+    for item in item_rows:
+        price = decimal_string(item['price']) if item['price'] is not None else None
+        items.setdefault(item['order_id'], []).append({
+            'product': {
+                'id': item['product_id'],
+                'name': item['product_name'],
+                'price': price,
+                'image': urls(item['product_image']),
+                'category': item['product_category'],
+                'description': item['product_description'],
+            },
+            'quantity': item['quantity'],
+            'product_name': item['product_name'],
+            'price': price,
+        })
+    return [
+        {
+            'id': row['id'],
+            'user': row['user__username'],
+            'items': items.get(row['id'], []),
+            'total_amount': decimal_string(row['total_amount']),
+            'created_at': datetime_string(row['created_at']),
+            'shipping_status': row['shipping_status'],
+        }
+        for row in rows
+    ]
+
+
+def cart_line_rows(cart_items, compact=False):
+    return cart_items.values(*(COMPACT_CART_LINE_FIELDS if compact else CART_LINE_FIELDS))
+
+
+def cart_lines(rows, compact=False):
+    """CartLineSerializer or CompactCartLineSerializer(many=True).data for cart_line_rows()."""
+    urls = MediaURLs()
+    if compact:
+        return [
+            {
+                'id': row['id'],
+                'product_id': row['product__id'],
+                'name': row['product__name'],
+                'price': row['product__price'],
+                'image': urls(row['product__image']),
+                'quantity': row['quantity'],
+                'line_total': row['line_total'],
+            }
+            for row in rows
+        ]
+    return [
+        {
+            'id': row['id'],
+            'product': product_dict(row, urls, CART_PRODUCT_COLUMNS),
+            'quantity': row['quantity'],
+            'line_total': row['line_total'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,164 @@
+import re
+
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Product
+
+FTS_TABLE = 'api_product_fts'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(term):
+    """Split a user query into plain words, dropping any search syntax."""
+    return WORD_RE.findall(term.lower())
+
+
+class PostgresProductSearch:
+    """
+    Ranked search over `Product.search_vector`, a weighted tsvector backed by
+    a GIN index (see migration 0007).
+    """
+    def search_vector(self):
+        from django.contrib.postgres.search import SearchVector
+
+        return (
+            SearchVector('name', weight='A', config='english')
+            + SearchVector('category', weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        )
+
+    def index(self, product_ids):
+        Product.objects.filter(pk__in=product_ids).update(search_vector=self.search_vector())
+
+    def remove(self, product_ids):
+        # The vector lives on the product row and goes away with it
+        pass
+
+    def rebuild(self):
+        Product.objects.update(search_vector=self.search_vector())
+
+    def search(self, term, prefix=False):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        words = search_terms(term)
+        if not words:
+            return Product.objects.none()
+        if prefix:
+            query = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config='english')
+        else:
+            query = SearchQuery(' '.join(words), search_type='plain', config='english')
+        return (
+            Product.objects.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', 'id')
+        )
+
+
+class SqliteRankedResults:
+    """
+    Lazy, sliceable result list for an FTS5 match, so Django's paginator can
+    count it and fetch a single page of ranked products.
+    """
+    def __init__(self, match):
+        self.match = match
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [self.match])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, page):
+        if not isinstance(page, slice):
+            raise TypeError("Search results can only be sliced")
+        offset = page.start or 0
+        limit = -1 if page.stop is None else page.stop - offset
+        with connection.cursor() as cursor:
+            # bm25 weights follow the column order: name, description, category
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0, 5.0), rowid LIMIT %s OFFSET %s",
+                [self.match, limit, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        products = Product.objects.in_bulk(ids)
+        return [products[pk] for pk in ids if pk in products]
+
+
+class SqliteProductSearch:
+    """
+    Ranked search through an FTS5 table holding a copy of each product's
+    searchable text, keyed by product id. Used for local and test runs.
+    """
+    def index(self, product_ids):
+        product_ids = list(product_ids)
+        rows = Product.objects.filter(pk__in=product_ids).values_list('id', 'name', 'description', 'category')
+        with connection.cursor() as cursor:
+            self._delete(cursor, product_ids)
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description, category) VALUES (%s, %s, %s, %s)",
+                list(rows),
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            self._delete(cursor, list(product_ids))
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description, category) "
+                "SELECT id, name, description, category FROM api_product"
+            )
+
+    def _delete(self, cursor, product_ids):
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+    def search(self, term, prefix=False):
+        words = search_terms(term)
+        if not words:
+            return []
+        suffix = '*' if prefix else ''
+        return SqliteRankedResults(' AND '.join(f'"{word}"{suffix}' for word in words))
+
+
+class IcontainsProductSearch:
+    """
+    Unindexed substring search, matching what `SearchFilter` does for the
+    admin product list. Used on databases without a full-text backend.
+    """
+    def index(self, product_ids):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, term, prefix=False):
+        queryset = Product.objects.order_by('id')
+        for word in search_terms(term):
+            queryset = queryset.filter(
+                Q(name__icontains=word) | Q(description__icontains=word) | Q(category__icontains=word)
+            )
+        return queryset
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresProductSearch,
+    'sqlite': SqliteProductSearch,
+}
+
+
+def get_search_backend():
+    return SEARCH_BACKENDS.get(connection.vendor, IcontainsProductSearch)()
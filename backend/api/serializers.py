@@ -1,19 +1,70 @@
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Product, Customer, Orders, OrderItem, CartItem
+from .images import variant_urls
+from .inventory import InsufficientStock
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    A ModelSerializer that takes an additional `fields` argument that
+    controls which fields should be displayed.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields:
+            # Drop any fields that are not specified in the `fields` argument.
+            allowed = set(fields)
+            for field_name in set(self.fields) - allowed:
+                self.fields.pop(field_name)
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    An image's resized copies as {format: {width: url}}, for building srcset
+    attributes. Empty until the variants have been generated.
+    """
+    def to_representation(self, value):
+        urls = variant_urls(value)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {
+                image_format: {width: request.build_absolute_uri(url) for width, url in by_width.items()}
+                for image_format, by_width in urls.items()
+            }
+        return urls
+
+class ProductSerializer(DynamicFieldsModelSerializer):
+    image_variants = ImageVariantsField()
 
-class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'image', 'price', 'category']
+        fields = ['id', 'sku', 'name', 'description', 'image', 'image_variants', 'price', 'category']
+
+class ProductImportSerializer(serializers.ModelSerializer):
+    """
+    Validates one row of a bulk product import. Columns left out of a row
+    are left unchanged on an existing product.
+    """
+    class Meta:
+        model = Product
+        fields = ['sku', 'name', 'description', 'price', 'category', 'stock']
+        extra_kwargs = {
+            # Existing SKUs are updated, and checking uniqueness would cost a query per row
+            'sku': {'required': True, 'allow_null': False, 'allow_blank': False, 'validators': []},
+            'price': {'min_value': 0},
+        }
 
 class CustomerSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     confirm_password = serializers.CharField(write_only=True, required=False)
     is_staff = serializers.BooleanField(read_only=True)
+    profile_picture_variants = ImageVariantsField()
 
     class Meta:
         model = Customer
-        fields = ['username', 'customer_name', 'email', 'phone_number', 'address', 'city', 'state', 'password', 'confirm_password', 'profile_picture','last_login', 'is_staff']
+        fields = ['username', 'customer_name', 'email', 'phone_number', 'address', 'city', 'state', 'password', 'confirm_password', 'profile_picture', 'profile_picture_variants', 'last_login', 'is_staff']
 
     def validate(self, data):
         # Existing validation for create method
@@ -23,11 +74,8 @@ class CustomerSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('confirm_password')
-        password = validated_data.pop('password')
-        customer = Customer.objects.create_user(**validated_data)
-        customer.set_password(password)
-        customer.save()
-        return customer
+        # create_user hashes and saves once
+        return Customer.objects.create_user(password=validated_data.pop('password'), **validated_data)
 
     def update(self, instance, validated_data):
         # Enforce password validation during update
@@ -46,14 +94,44 @@ class CustomerSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+class CustomerListSerializer(serializers.ModelSerializer):
+    """
+    The columns the admin customer directory shows, without the address,
+    profile picture and password fields of CustomerSerializer.
+    """
+    class Meta:
+        model = Customer
+        fields = ['id', 'username', 'customer_name', 'email', 'phone_number', 'city', 'state', 'last_login', 'is_staff']
+        read_only_fields = fields
+
+class SnapshotImageField(serializers.ReadOnlyField):
+    """A stored image name as a URL, absolute when there is a request, like ImageField."""
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = default_storage.url(value)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+class OrderedProductSerializer(serializers.Serializer):
+    """
+    The `product` of an order line, built from the line's checkout snapshot
+    rather than the live Product, so later catalog edits do not change it.
+    """
+    id = serializers.IntegerField(source='product_id', read_only=True)
+    name = serializers.CharField(source='product_name', read_only=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    image = SnapshotImageField(source='product_image')
+    category = serializers.CharField(source='product_category', read_only=True)
+    description = serializers.CharField(source='product_description', read_only=True)
+
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer()
-    product_name = serializers.ReadOnlyField(source='product.name')
-    price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2)
+    product = OrderedProductSerializer(source='*', read_only=True)
 
     class Meta:
         model = OrderItem
         fields = ['product', 'quantity', 'product_name', 'price']
+        read_only_fields = fields
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(source='orderitem_set', many=True, read_only=True)
@@ -65,13 +143,28 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'items', 'total_amount', 'created_at', 'shipping_status']
         read_only_fields = ['id', 'user', 'items', 'total_amount', 'created_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load users and order items up front so serializing any number of
+        orders costs a fixed number of queries. Lines carry their own product
+        snapshot, so Product is not read at all.
+        """
+        return queryset.select_related('user').prefetch_related(
+            Prefetch('orderitem_set', queryset=OrderItem.objects.order_by('id'))
+        )
+
     def update(self, instance, validated_data):
         user = self.context.get('request').user
         if not user or not user.is_staff:
             raise serializers.ValidationError({"detail": "Only admin users can update shipping status."})
 
         instance.shipping_status = validated_data.get('shipping_status', instance.shipping_status)
-        instance.save()
+        try:
+            instance.save()
+        except InsufficientStock as e:
+            # Reopening a cancelled order has to take its stock again
+            raise serializers.ValidationError({"shipping_status": str(e)})
         return instance
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -81,6 +174,71 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = ['id', 'product', 'quantity']
 
+class CartLineSerializer(CartItemSerializer):
+    """
+    A cart item annotated with `line_total` (quantity * product price).
+    """
+    line_total = serializers.IntegerField(read_only=True)
+
+    class Meta(CartItemSerializer.Meta):
+        fields = CartItemSerializer.Meta.fields + ['line_total']
+
+class CompactCartLineSerializer(serializers.ModelSerializer):
+    """
+    Flat cart line with just what the cart page shows, skipping the nested
+    product and its description.
+    """
+    product_id = serializers.IntegerField(source='product.id', read_only=True)
+    name = serializers.CharField(source='product.name', read_only=True)
+    price = serializers.IntegerField(source='product.price', read_only=True)
+    image = serializers.ImageField(source='product.image', read_only=True)
+    line_total = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['id', 'product_id', 'name', 'price', 'image', 'quantity', 'line_total']
+
+class CartSyncItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0)
+
+class CartSyncSerializer(serializers.Serializer):
+    """
+    A batch of cart changes. Each item sets the quantity of a product, and a
+    quantity of 0 removes it. With `replace`, products not listed are removed.
+    """
+    items = CartSyncItemSerializer(many=True)
+    replace = serializers.BooleanField(default=False)
+
+    def validate_items(self, items):
+        product_ids = [item['product_id'] for item in items]
+        if len(product_ids) != len(set(product_ids)):
+            raise serializers.ValidationError("Each product may only appear once.")
+        return items
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    """
+    Either sets a product's `stock` (null stops tracking it) or adds a signed
+    `delta` to its current stock.
+    """
+    product_id = serializers.IntegerField()
+    stock = serializers.IntegerField(min_value=0, allow_null=True, required=False)
+    delta = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if ('stock' in data) == ('delta' in data):
+            raise serializers.ValidationError("Provide exactly one of stock or delta.")
+        return data
+
+class StockAdjustmentBatchSerializer(serializers.Serializer):
+    items = StockAdjustmentSerializer(many=True)
+
+    def validate_items(self, items):
+        product_ids = [item['product_id'] for item in items]
+        if len(product_ids) != len(set(product_ids)):
+            raise serializers.ValidationError("Each product may only appear once.")
+        return items
+
 class ContactFormSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=100)
     email = serializers.EmailField()
@@ -0,0 +1,119 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .cache import catalog_cache
+from .images import needs_variants, process_variants, variant_pool
+from . import inventory, stats
+from .models import Customer, Orders, Product
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Covers the admin site as well as the API views
+    catalog_cache.bump_version()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    get_search_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Password resets, deactivation and profile edits all go through save()
+    invalidate_user(instance.pk)
+
+
+def generate_product_variants(pk, force=False):
+    if process_variants(Product, pk, 'image', 'image_variants', force=force):
+        catalog_cache.bump_version()
+        return True
+    return False
+
+
+def generate_profile_picture_variants(pk, force=False):
+    if process_variants(Customer, pk, 'profile_picture', 'profile_picture_variants', force=force):
+        invalidate_user(pk)
+        return True
+    return False
+
+
+@receiver(post_save, sender=Product)
+def schedule_product_variants(sender, instance, **kwargs):
+    # Fields missing from __dict__ were deferred; the job re-checks the row
+    if 'image' in instance.__dict__ and needs_variants(instance.image, instance.__dict__.get('image_variants')):
+        variant_pool.submit(generate_product_variants, instance.pk)
+
+
+@receiver(post_save, sender=Customer)
+def schedule_profile_picture_variants(sender, instance, **kwargs):
+    if 'profile_picture' in instance.__dict__ and needs_variants(
+        instance.profile_picture, instance.__dict__.get('profile_picture_variants')
+    ):
+        variant_pool.submit(generate_profile_picture_variants, instance.pk)
+
+
+@receiver(post_init, sender=Orders)
+def remember_shipping_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred field is not loaded just for this
+    instance._loaded_shipping_status = instance.__dict__.get('shipping_status')
+
+
+@receiver(post_save, sender=Orders)
+def update_order_rollups(sender, instance, created, **kwargs):
+    if created:
+        stats.record_order_created(instance)
+    elif instance._loaded_shipping_status not in (None, instance.shipping_status):
+        stats.record_status_change(instance, instance._loaded_shipping_status, instance.shipping_status)
+    instance._loaded_shipping_status = instance.shipping_status
+
+
+def lock_stored_status(instance):
+    """
+    Lock the order's row and return its stored shipping status, which a
+    concurrent save may have changed since `instance` was loaded. Must run
+    inside a transaction (Orders.save() and deletes are atomic). The status
+    is also kept as the instance's loaded status, so the rollups record the
+    same transition.
+    """
+    stored = (
+        Orders.objects.select_for_update().filter(pk=instance.pk).values_list('shipping_status', flat=True).first()
+    )
+    if stored is not None:
+        instance._loaded_shipping_status = stored
+    return stored
+
+
+@receiver(pre_delete, sender=Orders)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    stored = lock_stored_status(instance)
+    if stored is not None:
+        stats.record_order_deleted(instance, stored)
+
+
+@receiver(pre_save, sender=Orders)
+def move_stock_on_cancellation(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    old_status = lock_stored_status(instance)
+    if old_status is None or old_status == instance.shipping_status:
+        return
+    if instance.shipping_status == 'cancelled':
+        inventory.release(inventory.order_lines(instance))
+    elif old_status == 'cancelled':
+        inventory.reserve(inventory.order_lines(instance))
+
+
+@receiver(pre_delete, sender=Orders)
+def release_stock_on_delete(sender, instance, **kwargs):
+    if lock_stored_status(instance) not in (None, 'cancelled'):
+        inventory.release(inventory.order_lines(instance))
@@ -0,0 +1,130 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Customer, DailyCategoryRollup, DailyOrderRollup, OrderItem, Orders
+
+
+def bump(model, lookup, **increments):
+    """
+    Atomically add `increments` to the rollup row matching `lookup`,
+    creating the row on first use.
+    """
+    changes = {field: F(field) + value for field, value in increments.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments)
+    except IntegrityError:
+        # Another request created the row first
+        model.objects.filter(**lookup).update(**changes)
+
+
+def order_date(order):
+    return timezone.localdate(order.created_at)
+
+
+def record_order_created(order):
+    bump(DailyOrderRollup, {'date': order_date(order), 'shipping_status': order.shipping_status},
+         orders=1, revenue=order.total_amount)
+
+
+def record_order_items(order, lines):
+    """
+    Add an order's lines to the category rollup. `lines` holds
+    (category, quantity, line total) tuples.
+    """
+    by_category = {}
+    for category, quantity, line_total in lines:
+        units, revenue = by_category.get(category or '', (0, 0))
+        by_category[category or ''] = (units + quantity, revenue + line_total)
+    for category, (units, revenue) in by_category.items():
+        bump(DailyCategoryRollup, {'date': order_date(order), 'category': category}, units=units, revenue=revenue)
+
+
+def record_status_change(order, old_status, new_status):
+    date = order_date(order)
+    bump(DailyOrderRollup, {'date': date, 'shipping_status': old_status}, orders=-1, revenue=-order.total_amount)
+    bump(DailyOrderRollup, {'date': date, 'shipping_status': new_status}, orders=1, revenue=order.total_amount)
+
+
+def record_order_deleted(order, old_status):
+    bump(DailyOrderRollup, {'date': order_date(order), 'shipping_status': old_status},
+         orders=-1, revenue=-order.total_amount)
+    lines = (
+        OrderItem.objects.filter(order=order)
+        .values('product_category')
+        .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('price')))
+    )
+    for line in lines:
+        bump(DailyCategoryRollup, {'date': order_date(order), 'category': line['product_category']},
+             units=-line['units'], revenue=-(line['revenue'] or 0))
+
+
+@transaction.atomic
+def rebuild_rollups():
+    """
+    Recompute every rollup row from the orders tables.
+    """
+    DailyOrderRollup.objects.all().delete()
+    DailyCategoryRollup.objects.all().delete()
+
+    DailyOrderRollup.objects.bulk_create(
+        DailyOrderRollup(date=row['date'], shipping_status=row['shipping_status'], orders=row['orders'], revenue=row['revenue'])
+        for row in Orders.objects.annotate(date=TruncDate('created_at'))
+        .values('date', 'shipping_status')
+        .annotate(orders=Count('id'), revenue=Sum('total_amount'))
+    )
+    DailyCategoryRollup.objects.bulk_create(
+        DailyCategoryRollup(date=row['date'], category=row['product_category'], units=row['units'], revenue=row['revenue'] or 0)
+        for row in OrderItem.objects.annotate(date=TruncDate('order__created_at'))
+        .values('date', 'product_category')
+        .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('price')))
+    )
+
+
+def dashboard_stats(start=None, end=None):
+    """
+    Admin dashboard figures, read from the daily rollups. `start` and `end`
+    optionally limit orders and revenue to a date range.
+    """
+    money = DecimalField(max_digits=14, decimal_places=2)
+    order_rows = DailyOrderRollup.objects.all()
+    category_rows = DailyCategoryRollup.objects.all()
+    if start:
+        order_rows = order_rows.filter(date__gte=start)
+        category_rows = category_rows.filter(date__gte=start)
+    if end:
+        order_rows = order_rows.filter(date__lte=end)
+        category_rows = category_rows.filter(date__lte=end)
+
+    by_status = {
+        row['shipping_status']: row
+        for row in order_rows.values('shipping_status').annotate(
+            orders=Coalesce(Sum('orders'), 0), revenue=Coalesce(Sum('revenue'), Decimal(0), output_field=money)
+        )
+    }
+    by_category = (
+        category_rows.values('category')
+        .annotate(revenue=Coalesce(Sum('revenue'), Decimal(0), output_field=money), units=Coalesce(Sum('units'), 0))
+        .filter(units__gt=0)
+        .order_by('category')
+    )
+    return {
+        'total_customers': Customer.objects.count(),
+        'total_orders': sum(row['orders'] for row in by_status.values()),
+        'total_revenue': sum((row['revenue'] for row in by_status.values()), Decimal(0)),
+        'orders_by_status': [
+            {'name': status, 'value': by_status[status]['orders']}
+            for status, _ in Orders.SHIPPING_STATUS_CHOICES
+            if by_status.get(status, {}).get('orders')
+        ],
+        'revenue_by_category': [
+            {'name': row['category'] or 'uncategorized', 'revenue': row['revenue'], 'units': row['units']}
+            for row in by_category
+        ],
+    }
@@ -1,3 +1,1479 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import async_views, benchdata, exports
+from .authentication import last_login_buffer, user_cache
+from .tokens import blacklist_cache
+from .cache import LRUCacheBackend, catalog_cache
+from .media import media_index
+from .renderers import FastJSONRenderer
+from .metrics import MetricsMiddleware, registry
+from .mail import process_outbox
+from .stats import dashboard_stats, rebuild_rollups
+from .models import Cart, CartItem, Customer, OrderItem, Orders, OutboundEmail, Product
+
+
+class ProductCatalogTests(TestCase):
+    def setUp(self):
+        catalog_cache.reset()
+        self.client = APIClient()
+        for i in range(30):
+            Product.objects.create(
+                name=f"Product {i}",
+                description="A long description " * 20,
+                price=100 + i,
+                category='iphone' if i % 2 else 'ipad',
+            )
+
+    def test_catalog_is_cursor_paginated(self):
+        response = self.client.get(reverse('product_catalog'), {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
+
+        next_page = self.client.get(response.data['next'])
+        first_ids = [p['id'] for p in response.data['results']]
+        next_ids = [p['id'] for p in next_page.data['results']]
+        self.assertLess(max(first_ids), min(next_ids))
+
+    def test_catalog_filters_by_category(self):
+        response = self.client.get(reverse('product_catalog'), {'category': 'iphone', 'page_size': 100})
+        self.assertEqual(len(response.data['results']), 15)
+        self.assertTrue(all(p['category'] == 'iphone' for p in response.data['results']))
+
+    def test_catalog_sparse_fields_skip_description(self):
+        response = self.client.get(reverse('product_catalog'), {'fields': 'id,name,price,image,bogus'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'price', 'image'})
+
+    def test_get_products_stays_unpaginated_by_default(self):
+        response = self.client.get(reverse('get_products'))
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 30)
+
+    @override_settings(PRODUCTS_UNPAGINATED_COMPAT=False)
+    def test_get_products_uses_catalog_when_compat_disabled(self):
+        response = self.client.get(reverse('get_products'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('results', response.data)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        catalog_cache.reset()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="iPhone", price=999, category='iphone')
+
+    def test_repeat_reads_are_served_from_cache(self):
+        url = reverse('get_single_product', args=[self.product.id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['name'], "iPhone")
+        self.assertEqual(catalog_cache.stats()['hits'], 1)
+        self.assertEqual(catalog_cache.stats()['misses'], 1)
+
+    def test_product_write_invalidates_cached_responses(self):
+        url = reverse('get_products')
+        self.client.get(url)
+        self.product.price = 1099
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+            # Not invalidated before the write commits
+            self.assertEqual(self.client.get(url).json()[0]['price'], 999)
+        response = self.client.get(url)
+        self.assertEqual(response.json()[0]['price'], 1099)
+
+    def test_admin_detail_is_cached_and_invalidated_by_delete(self):
+        admin = Customer.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_authenticate(admin)
+        url = reverse('product_detail', args=[self.product.id])
+        self.assertEqual(self.client.get(url).json()['name'], "iPhone")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(url)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_if_none_match_returns_304(self):
+        url = reverse('get_single_product', args=[self.product.id])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}').status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 304)
+        # Part of the ETag is not a match
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'"x{etag[1:]}').status_code, 200)
+
+    def test_missing_product_is_not_cached(self):
+        response = self.client.get(reverse('get_single_product', args=[self.product.id + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_lru_backend_evicts_least_recently_used(self):
+        backend = LRUCacheBackend(max_entries=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), 1)
+
+    @override_settings(CATALOG_CACHE={'BACKEND': 'api.cache.DjangoCacheBackend', 'OPTIONS': {'alias': 'default'}})
+    def test_django_cache_backend(self):
+        catalog_cache.reset()
+        version = catalog_cache.stats()['version']
+        url = reverse('get_single_product', args=[self.product.id])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(catalog_cache.hits, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name="iPad", price=499, category='ipad')
+        self.assertEqual(catalog_cache.stats()['version'], version + 1)
+        catalog_cache.reset()
+
+    def test_lru_backend_shares_its_version_and_expires_entries(self):
+        worker, other_worker = LRUCacheBackend(timeout=60), LRUCacheBackend(timeout=0)
+        version = worker.get_version()
+        other_worker.bump_version()
+        self.assertEqual(worker.get_version(), version + 1)
+        other_worker.set('a', 1)
+        self.assertIsNone(other_worker.get('a'))
+
+
+class QueryCountTestMixin:
+    """
+    Helpers for asserting that an endpoint's query count does not grow with
+    the number of rows it returns.
+    """
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, grow, expected):
+        """
+        Call `grow()` between requests to add rows, and check that every
+        request to `url` costs exactly `expected` queries.
+        """
+        counts = [self.count_queries(url)]
+        for _ in range(2):
+            grow()
+            counts.append(self.count_queries(url))
+        self.assertEqual(counts, [expected] * len(counts))
+
+
+class OrderQueryCountTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = Customer.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.customer = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.products = [Product.objects.create(name=f"Product {i}", price=10 * i, category='ipad') for i in range(5)]
+
+    def add_orders(self, user, count=5):
+        for _ in range(count):
+            order = Orders.objects.create(user=user, total_amount=100)
+            for product in self.products:
+                OrderItem.objects.create(order=order, product=product, quantity=2, price=product.price)
+
+    def test_user_order_list_query_count_is_constant(self):
+        self.client.force_authenticate(self.customer)
+        self.add_orders(self.customer, 1)
+        self.assertConstantQueries(reverse('user_orders'), lambda: self.add_orders(self.customer), expected=2)
+
+    def test_all_orders_query_count_is_constant(self):
+        self.client.force_authenticate(self.admin)
+        self.add_orders(self.customer, 1)
+        # One extra query for the pagination count
+        self.assertConstantQueries(reverse('all_orders'), lambda: self.add_orders(self.customer), expected=3)
+
+    def test_order_detail_query_count(self):
+        self.client.force_authenticate(self.customer)
+        self.add_orders(self.customer, 1)
+        order = Orders.objects.get()
+        self.assertEqual(self.count_queries(reverse('order_detail', args=[order.id])), 2)
+
+
+class AllOrderListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = Customer.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_authenticate(admin)
+        self.alice = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.bob = Customer.objects.create_user('bob', 'bob@example.com', 'pass')
+        now = timezone.now()
+        self.orders = []
+        for days_ago, user, total, status in [
+            (10, self.alice, 100, 'delivered'),
+            (5, self.bob, 250, 'shipped'),
+            (1, self.alice, 400, 'pending'),
+        ]:
+            order = Orders.objects.create(user=user, total_amount=total, shipping_status=status)
+            Orders.objects.filter(pk=order.pk).update(created_at=now - timedelta(days=days_ago))
+            self.orders.append(order)
+
+    def get_ids(self, **params):
+        response = self.client.get(reverse('all_orders'), params)
+        self.assertEqual(response.status_code, 200)
+        return [order['id'] for order in response.data['results']]
+
+    def test_results_are_paginated_newest_first(self):
+        response = self.client.get(reverse('all_orders'), {'page_size': 2})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([o['id'] for o in response.data['results']], [self.orders[2].id, self.orders[1].id])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_created_range_filter(self):
+        after = (timezone.now() - timedelta(days=7)).isoformat()
+        before = (timezone.now() - timedelta(days=2)).isoformat()
+        self.assertEqual(self.get_ids(created_after=after, created_before=before), [self.orders[1].id])
+
+    def test_total_range_filter(self):
+        self.assertEqual(self.get_ids(total_min=200, total_max=300), [self.orders[1].id])
+
+    def test_numeric_search_matches_exact_id(self):
+        self.assertEqual(self.get_ids(search=str(self.orders[0].id)), [self.orders[0].id])
+        # Other Unicode digits are searched as a username
+        self.assertEqual(self.get_ids(search='²'), [])
+
+    def test_text_search_matches_username_prefix(self):
+        self.assertEqual(self.get_ids(search='ali'), [self.orders[2].id, self.orders[0].id])
+
+
+class CustomerListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = Customer.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_authenticate(self.admin)
+        self.alice = Customer.objects.create_user(
+            'alice', 'alice@example.com', 'pass', customer_name='Alice Smith', phone_number='9876500000',
+            city='Pune', state='Maharashtra', address='1 Main Road',
+        )
+        self.bob = Customer.objects.create_user(
+            'bob', 'bob@example.com', 'pass', customer_name='Bob Jones', phone_number='9123400000',
+            city='Chennai', state='Tamil Nadu',
+        )
+
+    def get_usernames(self, **params):
+        response = self.client.get(reverse('customer_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [customer['username'] for customer in response.data['results']]
+
+    def test_results_are_paginated_newest_first(self):
+        response = self.client.get(reverse('customer_list'), {'page_size': 2})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([c['username'] for c in response.data['results']], ['bob', 'alice'])
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(set(response.data['results'][0]), {
+            'id', 'username', 'customer_name', 'email', 'phone_number', 'city', 'state', 'last_login', 'is_staff',
+        })
+
+    def test_filters(self):
+        self.assertEqual(self.get_usernames(city='Pune'), ['alice'])
+        self.assertEqual(self.get_usernames(state='Tamil Nadu'), ['bob'])
+        self.assertEqual(self.get_usernames(is_staff='true'), ['admin'])
+
+    def test_search_matches_prefixes(self):
+        self.assertEqual(self.get_usernames(search='ALI'), ['alice'])
+        self.assertEqual(self.get_usernames(search='bob Jo'), ['bob'])
+        self.assertEqual(self.get_usernames(search='bob@'), ['bob'])
+        self.assertEqual(self.get_usernames(search='98765'), ['alice'])
+        self.assertEqual(self.get_usernames(search='Smith'), [])
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.get(reverse('customer_list')).status_code, 403)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = Customer.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_authenticate(admin)
+        self.alice = Customer.objects.create_user('alice', 'alice@example.com', 'pass', customer_name='=cmd()', city='Pune')
+        self.phone = Product.objects.create(name="Phone", price=100, category='iphone')
+        self.case = Product.objects.create(name="Case", price=20, category='others')
+        self.orders = []
+        for status, lines in [('delivered', [(self.phone, 1), (self.case, 2)]), ('pending', [(self.case, 1)]), ('pending', [])]:
+            order = Orders.objects.create(user=self.alice, total_amount=sum(p.price * q for p, q in lines), shipping_status=status)
+            OrderItem.objects.bulk_create(OrderItem.for_product(p, order=order, quantity=q) for p, q in lines)
+            self.orders.append(order)
+
+    def download(self, name, export_format, **params):
+        response = self.client.get(reverse(name, args=[export_format]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_orders_csv_has_a_row_per_line_item(self):
+        rows = list(csv.DictReader(StringIO(self.download('export_orders', 'csv'))))
+        self.assertEqual([(int(r['order_id']), r['product_name'], r['quantity']) for r in rows], [
+            (self.orders[0].id, 'Phone', '1'), (self.orders[0].id, 'Case', '2'),
+            (self.orders[1].id, 'Case', '1'), (self.orders[2].id, '', ''),
+        ])
+        self.assertEqual(rows[0]['username'], 'alice')
+
+    def test_orders_ndjson_with_filters(self):
+        lines = self.download('export_orders', 'ndjson', shipping_status='pending').splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r['order_id'] for r in records], [self.orders[1].id, self.orders[2].id])
+        self.assertEqual(records[0]['items'], [
+            {'product_id': self.case.id, 'product_name': 'Case', 'category': 'others', 'quantity': 1, 'unit_price': '20.00'},
+        ])
+
+    def test_orders_are_read_in_chunks(self):
+        # One cursor over the orders, fetched two rows at a time, and one query per batch for the items
+        with self.assertNumQueries(3):
+            records = list(exports.order_records(Orders.objects.all(), chunk_size=2))
+        self.assertEqual(len(records), 3)
+
+    def test_customers_csv_escapes_formulas(self):
+        rows = list(csv.DictReader(StringIO(self.download('export_customers', 'csv', city='Pune'))))
+        self.assertEqual([(r['username'], r['customer_name']) for r in rows], [('alice', "'=cmd()")])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(reverse('export_orders', args=['xml'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_orders', args=['csv']), {'total_min': 'x'}).status_code, 400)
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.get(reverse('export_orders', args=['csv'])).status_code, 403)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_data', 'orders', format='ndjson', filter=['shipping_status=delivered'], stdout=out)
+        self.assertEqual([json.loads(line)['order_id'] for line in out.getvalue().splitlines()], [self.orders[0].id])
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        catalog_cache.reset()
+        self.client = APIClient()
+        self.admin = Customer.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_authenticate(self.admin)
+        self.existing = Product.objects.create(sku='IP-15', name="iPhone 15", price=800, category='iphone', stock=5)
+
+    def post(self, body, content_type='text/csv'):
+        return self.client.post(reverse('product_import'), body, content_type=content_type)
+
+    def test_csv_upserts_by_sku_and_reports_bad_rows(self):
+        version = catalog_cache.stats()['version']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(
+                "sku,name,price,category,stock\n"
+                "IP-15,iPhone 15,750,iphone,\n"
+                "MB-AIR,MacBook Air,1200,macbook,10\n"
+                "BAD-1,Broken,-5,iphone,1\n"
+                "BAD-2,Broken,5,toaster,1\n"
+                ",No sku,5,others,1\n"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['error_count']), (1, 1, 3))
+        self.assertEqual([(e['line'], e['sku']) for e in response.data['errors']], [(4, 'BAD-1'), (5, 'BAD-2'), (6, None)])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+
+        self.existing.refresh_from_db()
+        # The empty stock cell leaves stock as it was
+        self.assertEqual((self.existing.id, self.existing.price, self.existing.stock), (self.existing.id, 750, 5))
+        self.assertEqual(Product.objects.get(sku='MB-AIR').stock, 10)
+        self.assertFalse(Product.objects.filter(sku__startswith='BAD').exists())
+        # Cache invalidated once for the whole import, and imported products are searchable
+        self.assertEqual(catalog_cache.stats()['version'], version + 1)
+        self.assertEqual([p['sku'] for p in self.client.get(reverse('product_search'), {'q': 'macbook'}).data['results']], ['MB-AIR'])
+
+    def test_ndjson_updates_only_the_given_columns(self):
+        response = self.post(
+            '{"sku": "IP-15", "price": 700}\n'
+            'not json\n'
+            '\n'
+            '{"sku": "W-1", "name": "Watch", "category": "watch"}\n'
+            '{"sku": "W-1", "name": "Watch SE", "category": "watch"}\n',
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['error_count']), (1, 1, 1))
+        self.assertEqual([e['line'] for e in response.data['errors']], [2])
+        self.assertEqual(response.data['superseded_count'], 1)
+        self.assertEqual(response.data['superseded'], [{'line': 4, 'sku': 'W-1', 'superseded_by': 5}])
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.price, self.existing.stock), ("iPhone 15", 700, 5))
+        self.assertEqual(Product.objects.get(sku='W-1').name, "Watch SE")
+
+    def test_invalid_utf8_is_reported_as_a_row_error(self):
+        response = self.post(b'sku,name\nAP-1,AirPods\n\xff\xfe,x\nAP-2,AirPods Pro\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['error_count']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 3)
+        self.assertEqual(self.post(b'sku,n\xffame\nAP-3,x\n').status_code, 400)
+
+        response = self.post(
+            b'{"sku": "W-1", "name": "Watch"}\n{"sku": "\xff"}\n{"sku": "W-2", "name": "Watch SE"}\n',
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual((response.data['created'], response.data['error_count']), (2, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 2)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def queries_for(count, prefix):
+            body = "sku,name,price\n" + ''.join(f"{prefix}-{i},Item {i},{i}\n" for i in range(count))
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.post(body).data['created'], count)
+            return len(ctx)
+        # 100 rows still fit in one INSERT under SQLite's parameter limit
+        self.assertEqual(queries_for(5, 'A'), queries_for(100, 'B'))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.post('', content_type='text/csv').status_code, 400)
+        self.assertEqual(self.post('name\nx\n').status_code, 400)
+        self.assertEqual(self.post('{}', content_type='application/json').status_code, 415)
+        self.client.force_authenticate(Customer.objects.create_user('bob', 'bob@example.com', 'pass'))
+        self.assertEqual(self.post('sku\nX\n').status_code, 403)
+
+    def test_command(self):
+        path = os.path.join(tempfile.mkdtemp(), 'catalog.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write("sku,name,price\nIP-15,iPhone 15,650\nAP-2,AirPods Max,x\nAP-1,AirPods,199\nAP-1,AirPods,179\n")
+        out, err = StringIO(), StringIO()
+        call_command('import_products', path, chunk_size=2, stdout=out, stderr=err)
+        self.assertEqual(
+            out.getvalue().strip(), "1 created, 1 updated, 1 rows rejected, 1 superseded by a later row with the same SKU"
+        )
+        self.assertIn('line 3 (AP-2)', err.getvalue())
+        self.assertEqual(Product.objects.get(sku='AP-1').price, 179)
+
+
+class OrderSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name="Phone", description="6.1-inch display", price=100, category='iphone', image='phone.jpg'
+        )
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        self.assertEqual(self.client.post(reverse('place_order')).status_code, 201)
+
+    def test_history_shows_the_product_as_bought(self):
+        Product.objects.filter(pk=self.product.pk).update(
+            name="Phone (2027)", description="6.3-inch display", price=150, category='others'
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('user_orders'))
+        self.assertFalse([q for q in ctx.captured_queries if 'api_product' in q['sql']])
+        item = response.data[0]['items'][0]
+        self.assertEqual((item['product_name'], item['price'], item['quantity']), ("Phone", '100.00', 2))
+        self.assertEqual(item['product'], {
+            'id': self.product.id, 'name': "Phone", 'price': '100.00', 'image': '/media/phone.jpg', 'category': 'iphone',
+            'description': "6.1-inch display",
+        })
+
+    def test_lines_outlive_their_product(self):
+        order = Orders.objects.get()
+        self.product.delete()
+        item = self.client.get(reverse('order_detail', args=[order.id])).data['items'][0]
+        self.assertEqual((item['product']['id'], item['product_name']), (None, "Phone"))
+        # Cancelling has no stock left to put back, and the rollups still use the snapshot category
+        order.shipping_status = 'cancelled'
+        order.save()
+        order.delete()
+        self.assertEqual(dashboard_stats()['revenue_by_category'], [])
+
+
+class FastRenderingTests(TestCase):
+    def setUp(self):
+        catalog_cache.reset()
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        admin = Customer.objects.create_user('admin', 'admin@example.com', 'pass', is_staff=True)
+        phone = Product.objects.create(
+            name="Phone\u2028", sku='PH-1', description="Long text", price=100, category='iphone', image='phone.jpg',
+            image_variants={'source': 'phone.jpg', 'webp': {'320': 'variants/phone-320.webp'}},
+        )
+        watch = Product.objects.create(name="Watch", price=50, category='watch')
+        Product.objects.create()
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=phone, quantity=2)
+        CartItem.objects.create(cart=cart, product=watch, quantity=1)
+        for status, products in [('pending', [phone, watch]), ('shipped', [watch]), ('cancelled', [])]:
+            order = Orders.objects.create(user=self.user, total_amount='150.5', shipping_status=status)
+            OrderItem.objects.bulk_create([OrderItem.for_product(p, order=order, quantity=2) for p in products])
+        OrderItem.objects.create(order=order, quantity=1)
+        watch.delete()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(admin)
+
+    def test_projections_match_serializers(self):
+        cases = [
+            (self.client, reverse('get_products')),
+            (self.client, reverse('view_cart')),
+            (self.client, reverse('view_cart') + '?compact=true'),
+            (self.client, reverse('user_orders')),
+            (self.admin_client, reverse('all_orders') + '?page_size=2&page=2'),
+            (self.admin_client, reverse('all_orders') + '?shipping_status=pending'),
+        ]
+        for client, path in cases:
+            with self.subTest(path=path):
+                with override_settings(FAST_RENDERING=False):
+                    catalog_cache.reset()
+                    expected = client.get(path)
+                with override_settings(FAST_RENDERING=True):
+                    catalog_cache.reset()
+                    response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            'decimal': Decimal('1.50'), 'when': timezone.now(), 'lazy': gettext_lazy("Hello"),
+            'text': "caf\xe9\u2029", 1: [None, 1.5, True], 'large': 2 ** 70,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.client.force_authenticate(self.user)
+        self.cart = Cart.objects.create(user=self.user)
+        self.products = Product.objects.bulk_create(
+            [Product(name=f"Product {i}", price=10 + i, category='ipad') for i in range(100)]
+        )
+
+    def fill_cart(self, size):
+        CartItem.objects.bulk_create([CartItem(cart=self.cart, product=p, quantity=2) for p in self.products[:size]])
+
+    def test_place_order_creates_items_and_empties_cart(self):
+        self.fill_cart(3)
+        response = self.client.post(reverse('place_order'))
+        self.assertEqual(response.status_code, 201)
+        order = Orders.objects.get()
+        self.assertEqual(order.total_amount, 2 * (10 + 11 + 12))
+        self.assertEqual(
+            sorted(order.orderitem_set.values_list('product__name', 'quantity', 'price')),
+            [(f"Product {i}", 2, 10 + i) for i in range(3)],
+        )
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_place_order_query_count_is_independent_of_cart_size(self):
+        # The day's first order also creates the dashboard rollup rows
+        self.fill_cart(1)
+        self.client.post(reverse('place_order'))
+        counts = []
+        for size in (1, 10, 100):
+            self.fill_cart(size)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.post(reverse('place_order')).status_code, 201)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_place_order_rejects_empty_cart(self):
+        response = self.client.post(reverse('place_order'))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Orders.objects.exists())
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("SMTP server unavailable")
+
+
+@override_settings(EMAIL_HOST_USER='shop@example.com')
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+
+    def place_order(self):
+        self.client.force_authenticate(self.user)
+        cart = Cart.objects.create(user=self.user)
+        product = Product.objects.create(name="AirPods", price=199, category='airpods')
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+        self.assertEqual(self.client.post(reverse('place_order')).status_code, 201)
+
+    def test_place_order_queues_confirmation_instead_of_sending(self):
+        self.place_order()
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.recipients, ['alice@example.com'])
+        self.assertEqual(email.html_template, 'order_confirmation_email.html')
+
+        call_command('send_queued_mail', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        html, mimetype = mail.outbox[0].alternatives[0]
+        self.assertEqual(mimetype, 'text/html')
+        self.assertIn("AirPods", html)
+        self.assertIn("398", html)
+        self.assertEqual(OutboundEmail.objects.get().status, 'sent')
+
+    def test_password_reset_and_contact_form_are_queued(self):
+        self.client.post(reverse('request_password_reset'), {'email': 'alice@example.com'})
+        self.client.post(reverse('contact_form'), {'name': "Bob", 'email': 'bob@example.com', 'message': "Hi"})
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+        self.assertEqual(process_outbox(workers=2), 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['alice@example.com', 'shop@example.com'])
+        reset = next(m for m in mail.outbox if m.to == ['alice@example.com'])
+        self.assertIn('/reset-password/', reset.alternatives[0][0])
+
+    @override_settings(EMAIL_BACKEND='api.tests.FailingEmailBackend', EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_sends_are_retried_with_backoff_then_given_up(self):
+        self.place_order()
+        process_outbox()
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn("SMTP server unavailable", email.last_error)
+
+        # Not due yet, so nothing is claimed
+        self.assertEqual(process_outbox(), 0)
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        process_outbox()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+
+class AddToCartTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(name="Watch", price=399, category='watch')
+
+    def add(self, quantity=1, product_id=None):
+        return self.client.post(reverse('add_to_cart'), {'product_id': product_id or self.product.id, 'quantity': quantity})
+
+    def test_first_add_creates_item_and_repeat_adds_increment(self):
+        self.assertEqual(self.add(2).status_code, 201)
+        self.assertEqual(self.add(3).status_code, 201)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_increment_costs_a_single_query(self):
+        self.add()
+        with self.assertNumQueries(1):
+            self.add()
+
+    def test_rejects_unknown_product_and_bad_quantity(self):
+        self.assertEqual(self.add(product_id=self.product.id + 1).status_code, 404)
+        self.assertEqual(self.add(quantity=0).status_code, 400)
+        self.assertEqual(self.add(quantity='many').status_code, 400)
+        self.assertFalse(CartItem.objects.exists())
+
+
+@unittest.skipIf(connection.vendor == 'sqlite', "SQLite's shared in-memory test database locks whole tables")
+class AddToCartConcurrencyTests(TransactionTestCase):
+    threads = 8
+    adds_per_thread = 10
+
+    def test_concurrent_adds_do_not_lose_increments_or_duplicate_rows(self):
+        user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        product = Product.objects.create(name="Watch", price=399, category='watch')
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def worker():
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                for _ in range(self.adds_per_thread):
+                    response = client.post(reverse('add_to_cart'), {'product_id': product.id, 'quantity': 1})
+                    if response.status_code != 201:
+                        errors.append(response.status_code)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(CartItem.objects.filter(cart__user=user).count(), 1)
+        self.assertEqual(CartItem.objects.get().quantity, self.threads * self.adds_per_thread)
+
+
+class SyncCartTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.client.force_authenticate(self.user)
+        self.products = Product.objects.bulk_create(
+            [Product(name=f"Product {i}", price=10 + i, category='ipad') for i in range(20)]
+        )
+        self.cart = Cart.objects.create(user=self.user)
+
+    def sync(self, items, **extra):
+        return self.client.post(reverse('sync_cart'), {'items': items, **extra}, format='json')
+
+    def quantities(self):
+        return dict(CartItem.objects.filter(cart=self.cart).values_list('product_id', 'quantity'))
+
+    def test_sync_inserts_updates_and_deletes(self):
+        a, b, c, d = self.products[:4]
+        CartItem.objects.create(cart=self.cart, product=a, quantity=1)
+        CartItem.objects.create(cart=self.cart, product=b, quantity=1)
+        CartItem.objects.create(cart=self.cart, product=d, quantity=1)
+
+        response = self.sync([
+            {'product_id': a.id, 'quantity': 5},
+            {'product_id': b.id, 'quantity': 0},
+            {'product_id': c.id, 'quantity': 2},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), {a.id: 5, c.id: 2, d.id: 1})
+        self.assertEqual({item['product']['id']: item['quantity'] for item in response.data['items']}, self.quantities())
+        self.assertEqual(response.data['item_count'], 8)
+
+    def test_replace_removes_unlisted_items(self):
+        a, b = self.products[:2]
+        CartItem.objects.create(cart=self.cart, product=a, quantity=1)
+        self.sync([{'product_id': b.id, 'quantity': 3}], replace=True)
+        self.assertEqual(self.quantities(), {b.id: 3})
+
+    def test_unknown_products_reject_the_whole_batch(self):
+        response = self.sync([
+            {'product_id': self.products[0].id, 'quantity': 1},
+            {'product_id': 999999, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['product_ids'], [999999])
+        self.assertEqual(self.quantities(), {})
+
+    def test_duplicate_products_and_negative_quantities_are_invalid(self):
+        product_id = self.products[0].id
+        self.assertEqual(self.sync([{'product_id': product_id, 'quantity': 1}] * 2).status_code, 400)
+        self.assertEqual(self.sync([{'product_id': product_id, 'quantity': -1}]).status_code, 400)
+
+    def test_query_count_is_independent_of_batch_size(self):
+        counts = []
+        for size in (4, 20):
+            CartItem.objects.filter(cart=self.cart).delete()
+            CartItem.objects.bulk_create([CartItem(cart=self.cart, product=p, quantity=1) for p in self.products[:size // 2]])
+            items = [{'product_id': p.id, 'quantity': 0 if i % 4 == 0 else 3} for i, p in enumerate(self.products[:size])]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.sync(items).status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class ViewCartTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.client.force_authenticate(self.user)
+        self.cart = Cart.objects.create(user=self.user)
+
+    def add_items(self, count):
+        products = Product.objects.bulk_create(
+            [Product(name=f"Product {i}", description="Long text", price=10, category='ipad') for i in range(count)]
+        )
+        CartItem.objects.bulk_create([CartItem(cart=self.cart, product=p, quantity=3) for p in products])
+
+    def test_totals_are_aggregated(self):
+        self.add_items(2)
+        CartItem.objects.filter(product__name="Product 1").update(quantity=1)
+        response = self.client.get(reverse('view_cart'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['line_total'] for item in response.data['items']], [30, 10])
+        self.assertEqual(response.data['item_count'], 4)
+        self.assertEqual(response.data['total'], 40)
+        self.assertEqual(response.data['items'][0]['product']['description'], "Long text")
+
+    def test_empty_cart_and_missing_cart(self):
+        response = self.client.get(reverse('view_cart'))
+        self.assertEqual((response.data['items'], response.data['item_count'], response.data['total']), ([], 0, 0))
+        self.cart.delete()
+        self.assertEqual(self.client.get(reverse('view_cart')).status_code, 404)
+
+    def test_compact_items_skip_nested_product(self):
+        self.add_items(1)
+        item = self.client.get(reverse('view_cart'), {'compact': 'true'}).data['items'][0]
+        self.assertEqual(set(item), {'id', 'product_id', 'name', 'price', 'image', 'quantity', 'line_total'})
+        self.assertEqual((item['name'], item['price'], item['line_total']), ("Product 0", 10, 30))
+
+    def test_query_count_is_independent_of_cart_size(self):
+        self.add_items(1)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('view_cart'))
+        self.add_items(20)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('view_cart'))
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.phone = Product.objects.create(name="iPhone 15 Pro", description="Titanium phone with a great camera", price=999, category='iphone')
+        self.case = Product.objects.create(name="Leather Case", description="Protective case for iPhone", price=59, category='others')
+        self.watch = Product.objects.create(name="Apple Watch", description="Fitness tracking on your wrist", price=399, category='watch')
+
+    def search(self, **params):
+        response = self.client.get(reverse('product_search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def names(self, **params):
+        return [product['name'] for product in self.search(**params).data['results']]
+
+    def test_results_are_ranked_by_relevance(self):
+        self.assertEqual(self.names(q='iphone'), ["iPhone 15 Pro", "Leather Case"])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.names(q='iphone case'), ["Leather Case"])
+
+    def test_prefix_mode_matches_partial_words(self):
+        self.assertEqual(self.names(q='wat'), [])
+        self.assertEqual(self.names(q='wat', prefix='true'), ["Apple Watch"])
+
+    def test_search_syntax_is_treated_as_plain_text(self):
+        self.assertEqual(self.names(q='"watch*) ('), ["Apple Watch"])
+        self.assertEqual(self.names(q=''), [])
+
+    def test_results_are_paginated(self):
+        response = self.search(q='iphone', page_size=1)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual([p['name'] for p in self.client.get(response.data['next']).data['results']], ["Leather Case"])
+
+    def test_index_follows_product_saves_and_deletes(self):
+        self.watch.name = "Apple Watch Ultra"
+        self.watch.save()
+        self.assertEqual(self.names(q='ultra'), ["Apple Watch Ultra"])
+        self.watch.delete()
+        self.assertEqual(self.names(q='watch'), [])
+
+    def test_sparse_fields(self):
+        result = self.search(q='watch', fields='id,name').data['results'][0]
+        self.assertEqual(set(result), {'id', 'name'})
+
+
+class AdminStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = Customer.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.customer = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.phone = Product.objects.create(name="iPhone", price=1000, category='iphone')
+        self.pods = Product.objects.create(name="AirPods", price=200, category='airpods')
+
+    def place_order(self, *lines):
+        self.client.force_authenticate(self.customer)
+        cart, _ = Cart.objects.get_or_create(user=self.customer)
+        for product, quantity in lines:
+            CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+        self.assertEqual(self.client.post(reverse('place_order')).status_code, 201)
+        return Orders.objects.latest('id')
+
+    def get_stats(self, **params):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('admin_stats'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_stats_follow_orders_and_status_changes(self):
+        first = self.place_order((self.phone, 1), (self.pods, 2))
+        self.place_order((self.pods, 1))
+        self.client.force_authenticate(self.admin)
+        self.client.put(reverse('order_detail', args=[first.id]), {'shipping_status': 'shipped'}, format='json')
+
+        data = self.get_stats()
+        self.assertEqual(data['total_customers'], 2)
+        self.assertEqual(data['total_orders'], 2)
+        self.assertEqual(data['total_revenue'], 1600)
+        self.assertEqual(data['orders_by_status'], [{'name': 'pending', 'value': 1}, {'name': 'shipped', 'value': 1}])
+        self.assertEqual(
+            [(row['name'], row['revenue'], row['units']) for row in data['revenue_by_category']],
+            [('airpods', 600, 3), ('iphone', 1000, 1)],
+        )
+
+    def test_rollups_match_a_full_rebuild_after_deletes(self):
+        first = self.place_order((self.phone, 2))
+        self.place_order((self.pods, 1), (self.phone, 1))
+        first.shipping_status = 'delivered'
+        first.save()
+        self.client.force_authenticate(self.admin)
+        self.client.delete(reverse('order_detail', args=[first.id]))
+
+        incremental = dashboard_stats()
+        rebuild_rollups()
+        self.assertEqual(incremental, dashboard_stats())
+        self.assertEqual(incremental['total_orders'], 1)
+
+    def test_date_range_and_constant_query_count(self):
+        self.place_order((self.phone, 1))
+        today = timezone.localdate()
+        self.assertEqual(self.get_stats(start=today.isoformat())['total_orders'], 1)
+        self.assertEqual(self.get_stats(end=(today - timedelta(days=1)).isoformat())['total_orders'], 0)
+        self.assertEqual(self.client.get(reverse('admin_stats'), {'start': 'yesterday'}).status_code, 400)
+
+        with self.assertNumQueries(3):
+            self.get_stats()
+        for _ in range(3):
+            self.place_order((self.pods, 1))
+        with self.assertNumQueries(3):
+            self.get_stats()
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get(reverse('admin_stats')).status_code, 403)
+
+
+class InventoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = Customer.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.customer = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.cart = Cart.objects.create(user=self.customer)
+        self.phone = Product.objects.create(name="iPhone", price=1000, category='iphone', stock=5)
+        self.pods = Product.objects.create(name="AirPods", price=200, category='airpods', stock=1)
+        self.cable = Product.objects.create(name="Cable", price=20, category='others')
+
+    def checkout(self, *lines):
+        self.client.force_authenticate(self.customer)
+        for product, quantity in lines:
+            CartItem.objects.create(cart=self.cart, product=product, quantity=quantity)
+        return self.client.post(reverse('place_order'))
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock
+
+    def test_checkout_takes_stock_and_ignores_untracked_products(self):
+        self.assertEqual(self.checkout((self.phone, 2), (self.cable, 50)).status_code, 201)
+        self.assertEqual(self.stock(self.phone), 3)
+        self.assertIsNone(self.stock(self.cable))
+
+    def test_shortfall_rolls_back_the_whole_order(self):
+        response = self.checkout((self.phone, 2), (self.pods, 2))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['product_ids'], [self.pods.id])
+        self.assertEqual((self.stock(self.phone), self.stock(self.pods)), (5, 1))
+        self.assertFalse(Orders.objects.exists())
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 2)
+
+    def test_cancelling_and_deleting_orders_returns_stock(self):
+        self.checkout((self.phone, 2))
+        order = Orders.objects.get()
+        self.client.force_authenticate(self.admin)
+        self.client.put(reverse('order_detail', args=[order.id]), {'shipping_status': 'cancelled'}, format='json')
+        self.assertEqual(self.stock(self.phone), 5)
+
+        self.client.put(reverse('order_detail', args=[order.id]), {'shipping_status': 'pending'}, format='json')
+        self.assertEqual(self.stock(self.phone), 3)
+        self.client.delete(reverse('order_detail', args=[order.id]))
+        self.assertEqual(self.stock(self.phone), 5)
+
+    def test_reopening_a_cancelled_order_needs_stock(self):
+        self.checkout((self.pods, 1))
+        order = Orders.objects.get()
+        order.shipping_status = 'cancelled'
+        order.save()
+        Product.objects.filter(pk=self.pods.pk).update(stock=0)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.put(reverse('order_detail', args=[order.id]), {'shipping_status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        order.refresh_from_db()
+        self.assertEqual(order.shipping_status, 'cancelled')
+
+    def test_stale_copies_of_an_order_move_stock_once(self):
+        self.checkout((self.phone, 2))
+        first, second = Orders.objects.get(), Orders.objects.get()
+        for order in (first, second):
+            order.shipping_status = 'cancelled'
+            order.save()
+        self.assertEqual(self.stock(self.phone), 5)
+        self.assertEqual(dashboard_stats()['orders_by_status'], [{'name': 'cancelled', 'value': 1}])
+
+        for order in (first, second):
+            order.shipping_status = 'pending'
+            order.save()
+        self.assertEqual(self.stock(self.phone), 3)
+
+    def test_admin_reopening_without_stock_shows_an_error(self):
+        self.checkout((self.pods, 1))
+        order = Orders.objects.get()
+        order.shipping_status = 'cancelled'
+        order.save()
+        Product.objects.filter(pk=self.pods.pk).update(stock=0)
+        item = order.orderitem_set.get()
+
+        self.client.force_login(self.admin)
+        url = reverse('admin:api_orders_change', args=[order.id])
+        response = self.client.post(url, {
+            'shipping_status': 'pending',
+            'orderitem_set-TOTAL_FORMS': 1, 'orderitem_set-INITIAL_FORMS': 1,
+            'orderitem_set-0-id': item.id, 'orderitem_set-0-order': order.id, 'orderitem_set-0-product': self.pods.id,
+            'orderitem_set-0-quantity': 1, 'orderitem_set-0-price': '200.00', 'orderitem_set-0-product_name': "AirPods",
+        })
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertIn("Insufficient stock", str(list(get_messages(response.wsgi_request))[0]))
+        order.refresh_from_db()
+        self.assertEqual(order.shipping_status, 'cancelled')
+
+    def test_bulk_stock_adjustment(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(reverse('product_stock_adjust'), {'items': [
+            {'product_id': self.phone.id, 'delta': -2},
+            {'product_id': self.pods.id, 'stock': 10},
+            {'product_id': self.cable.id, 'stock': 3},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['stock'] for row in response.data], [3, 10, 3])
+
+    def test_bulk_stock_adjustment_is_all_or_nothing(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(reverse('product_stock_adjust'), {'items': [
+            {'product_id': self.phone.id, 'delta': -6},
+            {'product_id': self.pods.id, 'stock': 10},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['product_ids'], [self.phone.id])
+        self.assertEqual((self.stock(self.phone), self.stock(self.pods)), (5, 1))
+
+        bad = {'items': [{'product_id': self.phone.id, 'stock': 1, 'delta': 1}]}
+        self.assertEqual(self.client.post(reverse('product_stock_adjust'), bad, format='json').status_code, 400)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache().clear()
+        self.client = APIClient()
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass', city='Pune')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=Product.objects.create(name="Phone", price=100), quantity=1)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_cached_user_saves_a_query_on_every_endpoint(self):
+        for name in ['view_cart', 'user_orders', 'customer_detail']:
+            url = reverse(name)
+            user_cache().clear()
+            # A cold cache loads the user exactly like JWTAuthentication
+            uncached = self.count_queries(url)
+            self.assertLess(self.count_queries(url), uncached, name)
+        # The profile comes straight from request.user
+        self.assertEqual(self.count_queries(reverse('customer_detail')), 0)
+
+    def test_saving_the_user_invalidates_the_cache(self):
+        self.client.get(reverse('customer_detail'))
+        self.user.is_staff = True
+        self.user.save()
+        self.assertTrue(self.client.get(reverse('customer_detail')).data['is_staff'])
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('view_cart')).status_code, 401)
+
+    def test_profile_update_does_not_save_stale_columns(self):
+        self.client.get(reverse('customer_detail'))
+        # Changed behind the cache's back, e.g. by another worker
+        Customer.objects.filter(pk=self.user.pk).update(phone_number='12345')
+        response = self.client.patch(reverse('customer_detail'), {'city': 'Delhi'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.city, self.user.phone_number), ('Delhi', '12345'))
+
+
+@override_settings(LAST_LOGIN_FLUSH_INTERVAL=0)
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        blacklist_cache.reset()
+        self.client = APIClient()
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+
+    def login(self):
+        return self.client.post(reverse('login_customer'), {'username': 'alice', 'password': 'pass'}).data['refresh']
+
+    def test_blacklist_checks_are_served_from_memory(self):
+        refresh = self.login()
+        self.assertEqual(self.client.post(reverse('logout'), {'refresh': refresh}).status_code, 205)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('logout'), {'refresh': refresh})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    @override_settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0)
+    def test_tokens_blacklisted_elsewhere_are_picked_up(self):
+        refresh = self.login()
+        self.assertNotIn(RefreshToken(refresh)['jti'], blacklist_cache)
+        # Blacklisted by another worker
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=RefreshToken(refresh)['jti']))
+        self.assertEqual(self.client.post(reverse('logout'), {'refresh': refresh}).status_code, 400)
+
+    def test_prune_deletes_expired_tokens_in_batches(self):
+        now = timezone.now()
+        for i in range(7):
+            token = OutstandingToken.objects.create(
+                jti=f'jti-{i}', token='token', expires_at=now + timedelta(hours=-1 if i < 5 else 1)
+            )
+            BlacklistedToken.objects.create(token=token)
+
+        out = StringIO()
+        call_command('prune_tokens', batch_size=2, stdout=out)
+        self.assertIn("Pruned 5 expired tokens", out.getvalue())
+        self.assertEqual(sorted(OutstandingToken.objects.values_list('jti', flat=True)), ['jti-5', 'jti-6'])
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+
+
+@override_settings(LAST_LOGIN_FLUSH_INTERVAL=3600)
+class LoginTests(TestCase):
+    def setUp(self):
+        last_login_buffer.reset()
+        self.client = APIClient()
+
+    def tearDown(self):
+        # Nothing recorded here may be written once the test database is gone
+        last_login_buffer.reset()
+
+    def login(self, username):
+        return self.client.post(reverse('login_customer'), {'username': username, 'password': 'secret-pass'})
+
+    def test_registration_hashes_and_saves_once(self):
+        data = {
+            'username': 'alice', 'customer_name': "Alice", 'email': 'alice@example.com', 'phone_number': '123',
+            'address': "1 Main St", 'city': "Pune", 'state': "MH", 'password': 'secret-pass', 'confirm_password': 'secret-pass',
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.post(reverse('register_customer'), data).status_code, 201)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+        user = Customer.objects.get(username='alice')
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password('secret-pass'))
+
+    def test_login_upgrades_old_hashes(self):
+        user = Customer.objects.create_user('alice', 'alice@example.com')
+        Customer.objects.filter(pk=user.pk).update(password=make_password('secret-pass', hasher='pbkdf2_sha256'))
+
+        self.assertEqual(self.login('alice').status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertEqual(self.login('alice').status_code, 200)
+
+    def test_last_login_is_written_in_batches(self):
+        for name in ['alice', 'bob']:
+            Customer.objects.create_user(name, f'{name}@example.com', 'secret-pass')
+            self.assertEqual(self.login(name).status_code, 200)
+        self.assertFalse(Customer.objects.filter(last_login__isnull=False).exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(last_login_buffer.flush(), 2)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(Customer.objects.filter(last_login__isnull=False).count(), 2)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        user_cache().clear()
+        catalog_cache.reset()
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.product = Product.objects.create(name="Phone", description="Long text", price=100, category='iphone')
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        order = Orders.objects.create(user=self.user, total_amount=200)
+        OrderItem.objects.create(order=order, product=self.product, quantity=2, price=100)
+
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.factory = AsyncRequestFactory()
+
+    async def call(self, view, path, *args, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = await view(self.factory.get(path, headers=headers), *args)
+        return response.status_code, json.loads(response.content)
+
+    def sync_call(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.json()
+
+    async def test_async_views_match_sync_views(self):
+        cases = [
+            (async_views.get_products, reverse('get_products'), ()),
+            (async_views.get_single_product, reverse('get_single_product', args=[self.product.id]), (self.product.id,)),
+            (async_views.get_single_product, reverse('get_single_product', args=[0]), (0,)),
+            (async_views.view_cart, reverse('view_cart'), ()),
+            (async_views.view_cart, reverse('view_cart') + '?compact=true', ()),
+            (async_views.user_orders, reverse('user_orders'), ()),
+        ]
+        for view, path, args in cases:
+            with self.subTest(path=path):
+                catalog_cache.reset()
+                expected = await sync_to_async(self.sync_call)(path)
+                catalog_cache.reset()
+                self.assertEqual(await self.call(view, path, *args, token=self.token), expected)
+
+    async def test_authentication_is_required(self):
+        status_code, body = await self.call(async_views.view_cart, reverse('view_cart'))
+        self.assertEqual(status_code, 401)
+        status_code, body = await self.call(async_views.user_orders, reverse('user_orders'), token='bogus')
+        self.assertEqual((status_code, body['code']), (401, 'token_not_valid'))
+
+
+def image_upload(name, size, image_format='JPEG', mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0)
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        catalog_cache.reset()
+
+    def create_product(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Phone", price=100, image=upload)
+        product.refresh_from_db()
+        return product
+
+    def test_variants_are_built_on_upload(self):
+        product = self.create_product(image_upload('phone.jpg', (1000, 500)))
+        variants = product.image_variants
+        self.assertEqual(variants['source'], product.image.name)
+        self.assertEqual(set(variants), {'source', 'webp', 'jpeg'})
+        self.assertEqual(set(variants['webp']), {'150', '300', '800'})
+        with Image.open(f"{self.media_root}/{variants['webp']['300']}") as card:
+            self.assertEqual((card.format, card.size), ('WEBP', (300, 150)))
+        self.assertRegex(variants['jpeg']['800'], r'^variants/phone-800w-[0-9a-f]{16}\.jpeg$')
+
+        data = self.client.get(reverse('get_single_product', args=[product.id])).json()
+        self.assertEqual(data['image_variants']['webp']['150'], f"/media/{variants['webp']['150']}")
+
+    def test_small_images_are_not_upscaled(self):
+        product = self.create_product(image_upload('icon.png', (200, 200), 'PNG', 'RGBA'))
+        self.assertEqual(set(product.image_variants), {'source', 'webp', 'png'})
+        self.assertEqual(set(product.image_variants['png']), {'150', '200'})
+
+    def test_replacing_or_removing_the_image_updates_variants(self):
+        product = self.create_product(image_upload('phone.jpg', (400, 400)))
+        old = product.image_variants
+        product.image = image_upload('phone.jpg', (400, 400), mode='L')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+        self.assertNotEqual(product.image_variants['webp'], old['webp'])
+
+        product.image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants, {})
+
+    def test_backfill_command(self):
+        product = self.create_product(image_upload('phone.jpg', (400, 400)))
+        Product.objects.filter(pk=product.pk).update(image_variants={})
+        out = StringIO()
+        call_command('generate_image_variants', workers=1, stdout=out)
+        self.assertIn("Product: built variants for 1 of 1 images", out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual(set(product.image_variants['webp']), {'150', '300', '400'})
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        media_index.reset()
+        self.write('photo.jpg', b'0123456789')
+
+    def write(self, name, content):
+        path = f'{self.media_root}/{name}'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def get(self, name, **headers):
+        return self.client.get(f'/media/{name}', headers=headers)
+
+    def test_serves_files_with_validators(self):
+        response = self.get('photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+
+        self.assertEqual(self.get('photo.jpg', if_none_match=response['ETag']).status_code, 304)
+        self.assertEqual(self.get('photo.jpg', if_modified_since=response['Last-Modified']).status_code, 304)
+
+    def test_hashed_names_are_immutable(self):
+        self.write('variants/photo-300w-0123456789abcdef.webp', b'webp')
+        response = self.get('variants/photo-300w-0123456789abcdef.webp')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_range_requests(self):
+        response = self.get('photo.jpg', range='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(self.get('photo.jpg', range='bytes=-3').streaming_content), b'789')
+        self.assertEqual(self.get('photo.jpg', range='bytes=20-').status_code, 416)
+        # A stale If-Range gets the whole file
+        self.assertEqual(self.get('photo.jpg', range='bytes=2-5', if_range='"old"').status_code, 200)
+
+    def test_precompressed_siblings(self):
+        self.write('logo.svg', b'<svg/>')
+        self.write('logo.svg.gz', b'gzipped')
+        media_index.reset()
+        response = self.get('logo.svg', accept_encoding='gzip, deflate')
+        self.assertEqual((response['Content-Encoding'], response['Vary']), ('gzip', 'Accept-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), b'gzipped')
+        self.assertNotIn('Content-Encoding', self.get('logo.svg'))
+
+    def test_files_replaced_in_place_are_revalidated(self):
+        old_etag = self.get('photo.jpg')['ETag']
+        self.write('photo.jpg', b'a longer replacement image body')
+
+        response = self.get('photo.jpg', if_none_match=old_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], old_etag)
+        self.assertEqual(response['Content-Length'], '31')
+        self.assertEqual(b''.join(response.streaming_content), b'a longer replacement image body')
+        self.assertEqual(self.get('photo.jpg', range='bytes=-4')['Content-Range'], 'bytes 27-30/31')
+
+    def test_new_uploads_and_missing_files(self):
+        self.get('photo.jpg')
+        self.write('later.png', b'png')
+        self.assertEqual(self.get('later.png').status_code, 200)
+        self.assertEqual(self.get('missing.png').status_code, 404)
+        self.assertEqual(self.get('../settings.py').status_code, 404)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        catalog_cache.reset()
+        self.product = Product.objects.create(name="Phone", price=100, category='iphone')
+        self.user = Customer.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def series(self, histogram, route, method='GET'):
+        return histogram.series.get((route, method))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_requests_are_recorded_per_route(self):
+        self.client.get(reverse('get_single_product', args=[self.product.id]))
+        self.client.get(reverse('get_single_product', args=[0]))
+        self.client.get(reverse('user_orders'))
+
+        route = '/api/product/<int:pk>/'
+        self.assertEqual(registry.requests[(route, 'GET', 200)], 1)
+        self.assertEqual(registry.requests[(route, 'GET', 404)], 1)
+        self.assertEqual(self.series(registry.queries, route)[2], 2)
+        self.assertGreater(self.series(registry.queries, '/api/user-orders/')[1], 0)
+        self.assertGreater(self.series(registry.render, '/api/user-orders/')[1], 0)
+
+        body = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'}).content.decode()
+        self.assertIn(f'http_requests_total{{route="{route}",method="GET",status="200",pid="{os.getpid()}"}} 1', body)
+        self.assertIn('http_request_queries_bucket{route="/api/user-orders/",method="GET"', body)
+        # Scrapes are not counted
+        self.assertNotIn('route="/metrics"', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code, 200)
+
+    def test_metrics_without_a_token_are_only_served_in_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0, METRICS_SLOW_QUERY_MS=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('api.metrics', 'WARNING') as logs:
+            self.client.get(reverse('user_orders'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['route'], entry['status']), ('/api/user-orders/', 200))
+        self.assertEqual(len(entry['slow_queries']), entry['queries'])
+        self.assertIn('SELECT', entry['slow_queries'][0]['sql'])
+
+    async def test_async_requests(self):
+        async def view(request):
+            await Product.objects.acount()
+            return await sync_to_async(lambda: HttpResponse())()
+
+        middleware = MetricsMiddleware(view)
+        request = AsyncRequestFactory().get('/async/')
+        response = await middleware(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.series(registry.queries, '<unmatched>')[1], 1)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_generated_data_drives_every_step(self):
+        benchdata.generate(customers=5, products=14, orders=20, seed=1)
+        self.assertEqual(benchdata.bench_customers().count(), 6)
+        self.assertEqual(set(benchdata.bench_products().values_list('category', flat=True)),
+                         {category for category, _ in Product.CATEGORY_CHOICES})
+        self.assertEqual(Orders.objects.count(), 20)
+
+        path = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command('bench_storefront', flows=2, warmup=0, save_baseline=path, stdout=StringIO())
+        with open(path) as f:
+            steps = json.load(f)['steps']
+        self.assertIn('place-order', steps)
+        self.assertEqual({name: step['errors'] for name, step in steps.items()}, dict.fromkeys(steps, 0))
+        # The run's orders were rolled back
+        self.assertEqual(Orders.objects.count(), 20)
+
+        steps['place-order']['queries'] -= 5
+        with open(path, 'w') as f:
+            json.dump({'steps': steps}, f)
+        with self.assertRaisesMessage(CommandError, 'place-order'):
+            call_command('bench_storefront', flows=2, warmup=0, baseline=path, tolerance=100, stdout=StringIO())
+
+        benchdata.clear()
+        self.assertFalse(benchdata.bench_customers().exists())
+        self.assertFalse(Orders.objects.exists())
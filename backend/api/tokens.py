@@ -0,0 +1,100 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+class BlacklistCache:
+    """
+    In-process set of the JTIs of blacklisted, unexpired tokens, so checking
+    a refresh token does not query the blacklist tables. It is loaded on first
+    use and then picks up tokens blacklisted by other workers every
+    TOKEN_BLACKLIST_SYNC_INTERVAL seconds.
+    """
+    def __init__(self):
+        self._expiry = {}
+        self._last_id = None
+        self._synced_at = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._expiry = {}
+            self._last_id = None
+            self._synced_at = 0
+
+    def sync(self):
+        """Load blacklist rows added since the last sync and drop expired JTIs."""
+        now = timezone.now()
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+        if self._last_id is not None:
+            rows = rows.filter(id__gt=self._last_id)
+        rows = rows.order_by('id').values_list('id', 'token__jti', 'token__expires_at')
+        with self._lock:
+            for row_id, jti, expires_at in rows.iterator(chunk_size=10000):
+                self._expiry[jti] = expires_at
+                self._last_id = row_id
+            if self._last_id is None:
+                self._last_id = 0
+            self._expiry = {jti: expires_at for jti, expires_at in self._expiry.items() if expires_at > now}
+            self._synced_at = time.monotonic()
+
+    def __contains__(self, jti):
+        if time.monotonic() - self._synced_at >= settings.TOKEN_BLACKLIST_SYNC_INTERVAL or self._last_id is None:
+            self.sync()
+        return jti in self._expiry
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._expiry[jti] = expires_at
+
+
+blacklist_cache = BlacklistCache()
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    Refresh token whose blacklist check is answered by `blacklist_cache`.
+    """
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in blacklist_cache:
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        blacklist_cache.add(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp']))
+        return blacklisted
+
+
+def prune_expired_tokens(batch_size=10000):
+    """
+    Delete expired outstanding tokens, and their blacklist entries, walking
+    the primary key in ranges of `batch_size` so each delete is short and
+    uses the index. Returns the number of outstanding tokens deleted.
+    """
+    now = timezone.now()
+    bounds = OutstandingToken.objects.order_by('id').values_list('id', flat=True)
+    first, last = bounds.first(), bounds.last()
+    if first is None:
+        return 0
+
+    deleted = 0
+    for start in range(first, last + 1, batch_size):
+        with transaction.atomic():
+            _, per_model = (
+                OutstandingToken.objects.filter(id__gte=start, id__lt=start + batch_size, expires_at__lte=now)
+                .only('id')
+                .delete()
+            )
+        deleted += per_model.get(OutstandingToken._meta.label, 0)
+    return deleted
@@ -1,5 +1,6 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 from .views import (
     request_password_reset,
     reset_password,
@@ -8,8 +9,11 @@ from .views import (
     OrderDetail,
     add_to_cart,
     view_cart,
+    sync_cart,
     place_order,
     get_products,
+    ProductCatalog,
+    ProductSearch,
     register_customer,
     login_customer,
     logout,
@@ -19,12 +23,19 @@ from .views import (
     CustomerList,
     ProductListCreate,
     ProductDetail,
+    ProductStockAdjust,
+    ProductImport,
     AllOrderList,
+    AdminStats,
+    OrderExport,
+    CustomerExport,
 )
 
 urlpatterns = [
     path('', views.hello_user, name='hello_user'),
     path('getProducts/', get_products, name='get_products'),
+    path('catalog/', ProductCatalog.as_view(), name='product_catalog'),
+    path('search/', ProductSearch.as_view(), name='product_search'),
     path('register/', register_customer, name='register_customer'),
     path('login/', login_customer, name='login_customer'),
     path('customer/', CustomerDetail.as_view(), name='customer_detail'),
@@ -33,6 +44,7 @@ urlpatterns = [
     path('reset-password/<uidb64>/<token>/', reset_password, name='reset_password'),
     path('add-to-cart/', add_to_cart, name='add_to_cart'),
     path('view-cart/', view_cart, name='view_cart'),
+    path('cart/sync/', sync_cart, name='sync_cart'),
     path('place-order/', place_order, name='place_order'),
     path('user-orders/', UserOrderList.as_view(), name='user_orders'),
     path('order/<int:pk>/', OrderDetail.as_view(), name='order_detail'),
@@ -43,6 +55,22 @@ urlpatterns = [
     # Admin Dashboard URLs
     path('customers/', CustomerList.as_view(), name='customer_list'),
     path('all-orders/', AllOrderList.as_view(), name='all_orders'),
+    path('admin/stats/', AdminStats.as_view(), name='admin_stats'),
+    path('admin/export/orders.<str:export_format>', OrderExport.as_view(), name='export_orders'),
+    path('admin/export/customers.<str:export_format>', CustomerExport.as_view(), name='export_customers'),
     path('products/', ProductListCreate.as_view(), name='product_list_create'),
     path('products/<int:pk>/', ProductDetail.as_view(), name='product_detail'),
-]
\ No newline at end of file
+    path('products/stock/', ProductStockAdjust.as_view(), name='product_stock_adjust'),
+    path('products/import/', ProductImport.as_view(), name='product_import'),
+]
+# Async versions of the read-heavy endpoints, for ASGI deployments. Listed
+# first so they take over the same URLs.
+async_urlpatterns = [
+    path('getProducts/', async_views.get_products, name='get_products'),
+    path('product/<int:pk>/', async_views.get_single_product, name='get_single_product'),
+    path('view-cart/', async_views.view_cart, name='view_cart'),
+    path('user-orders/', async_views.user_orders, name='user_orders'),
+]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
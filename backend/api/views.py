@@ -2,26 +2,36 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Product, Customer, Orders, OrderItem, Cart, CartItem
-from .serializers import ProductSerializer, CustomerSerializer, OrderSerializer, CartItemSerializer, OrderItemSerializer, ContactFormSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
+from .serializers import ProductSerializer, CustomerSerializer, CustomerListSerializer, OrderSerializer, CartItemSerializer, OrderItemSerializer, ContactFormSerializer, CartSyncSerializer, CartLineSerializer, CompactCartLineSerializer, StockAdjustmentBatchSerializer
 from django.contrib.auth import authenticate, get_user_model
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import generics
 import logging
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.template.loader import render_to_string
-from django.core.mail import send_mail, BadHeaderError
 from rest_framework.views import APIView
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, Sum
+from django.db.models.functions import Coalesce
 from .models import CartItem
 from rest_framework import filters # Import filters
 from django_filters.rest_framework import DjangoFilterBackend # Import DjangoFilterBackend
+from .pagination import ProductCursorPagination, OrderPagination, CustomerPagination, ProductSearchPagination
+from .search import get_search_backend
+from . import exports, inventory, projections, stats
+from .inventory import InsufficientStock
+from .imports import ProductCSVParser, ProductImporter, ProductNDJSONParser
+from .filters import CustomerFilter, CustomerSearchFilter, OrderFilter, OrderSearchFilter
+from .authentication import last_login_buffer
+from .cache import catalog_cache
+from .mail import queue_email
+from .tokens import RefreshToken
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -36,16 +46,77 @@ def hello_user(request):
 
 @api_view(['GET'])
 def get_products(request):
-    products = Product.objects.all()
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data)
+    if not settings.PRODUCTS_UNPAGINATED_COMPAT:
+        return ProductCatalog.as_view()(request._request)
+    return catalog_cache.respond(request, all_products)
+
+def all_products():
+    if settings.FAST_RENDERING:
+        return projections.products(Product.objects.values(*projections.PRODUCT_FIELDS))
+    return ProductSerializer(Product.objects.all(), many=True).data
+
+def query_flag(request, name):
+    """
+    Read a boolean query parameter such as ?compact=true.
+    """
+    # GET rather than query_params, so plain Django requests work too
+    return request.GET.get(name, '').lower() in ('1', 'true', 'yes')
+
+def requested_product_fields(request):
+    """
+    Parse a sparse fieldset such as ?fields=id,name,price,image, ignoring
+    names that are not product fields.
+    """
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    fields = [name.strip() for name in raw.split(',') if name.strip() in ProductSerializer.Meta.fields]
+    return fields or None
+
+class ProductCatalog(generics.ListAPIView):
+    """
+    Public product listing, cursor-paginated on the primary key, with an
+    optional category filter and sparse fieldsets.
+    """
+    serializer_class = ProductSerializer
+    pagination_class = ProductCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['category']
+
+    def get_queryset(self):
+        queryset = Product.objects.all()
+        fields = requested_product_fields(self.request)
+        if fields:
+            # Only load the selected columns; the cursor always needs the id
+            queryset = queryset.only('id', *fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', requested_product_fields(self.request))
+        return super().get_serializer(*args, **kwargs)
+
+class ProductSearch(generics.ListAPIView):
+    """
+    Public full-text product search, ranked by relevance and paginated.
+    ?q= holds the search text; ?prefix=true matches word prefixes for
+    typeahead. Supports the same ?fields= option as the catalog.
+    """
+    serializer_class = ProductSerializer
+    pagination_class = ProductSearchPagination
+    filter_backends = []
+
+    def get_queryset(self):
+        term = self.request.query_params.get('q', '')
+        return get_search_backend().search(term, prefix=query_flag(self.request, 'prefix'))
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', requested_product_fields(self.request))
+        return super().get_serializer(*args, **kwargs)
 
 @api_view(['GET'])
 def get_single_product(request, pk):
     try:
-        product = Product.objects.get(id=pk)
-        serializer = ProductSerializer(product)
-        return Response(serializer.data)
+        return catalog_cache.respond(request, lambda: ProductSerializer(Product.objects.get(id=pk)).data)
     except Product.DoesNotExist:
         return Response({"detail": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -63,10 +134,9 @@ def login_customer(request):
     password = request.data.get('password')
 
     user = authenticate(username=username, password=password)
-    print(user)
     if user is not None:
-        # Update last login time
-        Customer.objects.filter(username=username).update(last_login=timezone.now())
+        # Written in batches by a background thread, not during the login
+        last_login_buffer.record(user.pk)
 
         refresh = RefreshToken.for_user(user)
 
@@ -97,7 +167,12 @@ class CustomerDetail(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return Customer.objects.get(username=self.request.user.username)
+        # The authenticated user is the customer; no need to look it up again
+        user = self.request.user
+        if self.request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            # request.user may be a cached copy; never save stale columns over newer ones
+            user.refresh_from_db()
+        return user
 
 @api_view(['POST'])
 def request_password_reset(request):
@@ -109,28 +184,16 @@ def request_password_reset(request):
         uid = urlsafe_base64_encode(force_bytes(user.pk))
         reset_url = f"http://localhost:3000/reset-password/{uid}/{token}/"
 
-        # Send email
+        # Queue email
         subject = "Password Reset Request"
-        html_message = render_to_string('password_reset_email.html', {
-            'user': user,
-            'reset_url': reset_url,
-        })
         plain_message = "Dear " + user.username + ", You requested a password reset. Click the link to reset your password: " + reset_url
-        
-        try:
-            send_mail(
-                subject,
-                plain_message,
-                settings.EMAIL_HOST_USER, 
-                [email], 
-                fail_silently=False, 
-                html_message=html_message
-            )
-        except BadHeaderError:
-            return Response({"detail": "Invalid header found."}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            logger.error(f"Failed to send email: {e}")
-            return Response({"detail": "Failed to send email."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        queue_email(
+            subject,
+            plain_message,
+            [email],
+            html_template='password_reset_email.html',
+            context={'user': {'username': user.username}, 'reset_url': reset_url},
+        )
 
         return Response({"detail": "Password reset email sent"}, status=status.HTTP_200_OK)
     except User.DoesNotExist:
@@ -163,23 +226,38 @@ def add_to_cart(request):
         return Response({"detail": "Product ID is required"}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        product = Product.objects.get(pk=product_id)
-    except Product.DoesNotExist:
-        return Response({"detail": "Product does not exist"}, status=status.HTTP_404_NOT_FOUND)
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        quantity = 0
+    if quantity < 1:
+        return Response({"detail": "Quantity must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
 
     user = request.user
-    cart, created = Cart.objects.get_or_create(user=user)
+    # Common case: the product is already in the cart, so a single atomic
+    # UPDATE bumps the quantity without reading the row first.
+    if increment_cart_item(CartItem.objects.filter(cart__user=user, product_id=product_id), quantity):
+        return Response({"detail": "Product added to cart successfully"}, status=status.HTTP_201_CREATED)
 
-    cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-    if not created:
-        cart_item.quantity += int(quantity)
-        cart_item.save()
-    else:
-        cart_item.quantity = int(quantity)
-        cart_item.save()
+    if not Product.objects.filter(pk=product_id).exists():
+        return Response({"detail": "Product does not exist"}, status=status.HTTP_404_NOT_FOUND)
+
+    cart, created = Cart.objects.get_or_create(user=user)
+    try:
+        with transaction.atomic():
+            CartItem.objects.create(cart=cart, product_id=product_id, quantity=quantity)
+    except IntegrityError:
+        # A concurrent request inserted the row first; add to it instead
+        increment_cart_item(CartItem.objects.filter(cart=cart, product_id=product_id), quantity)
 
     return Response({"detail": "Product added to cart successfully"}, status=status.HTTP_201_CREATED)
 
+def increment_cart_item(cart_items, quantity):
+    """
+    Atomically add `quantity` to the matching cart row. Returns False when
+    there is no such row.
+    """
+    return cart_items.update(quantity=F('quantity') + quantity) > 0
+
 class CartItemDetail(APIView):
     """
     Retrieve, update or delete a cart item instance.
@@ -205,79 +283,168 @@ class CartItemDetail(APIView):
         cart_item.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
     
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def sync_cart(request):
+    """
+    Apply a batch of cart changes in one request and return the resulting
+    cart in the same format as view_cart.
+    """
+    serializer = CartSyncSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    quantities = {item['product_id']: item['quantity'] for item in serializer.validated_data['items']}
+    products = Product.objects.in_bulk(list(quantities))
+    missing = sorted(set(quantities) - set(products))
+    if missing:
+        return Response({"detail": "Products do not exist", "product_ids": missing}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        with transaction.atomic():
+            cart, created = Cart.objects.get_or_create(user=request.user)
+            existing = {item.product_id: item for item in CartItem.objects.filter(cart=cart)}
+
+            to_create, to_update, to_delete = [], [], []
+            for product_id, quantity in quantities.items():
+                item = existing.get(product_id)
+                if quantity == 0:
+                    if item:
+                        to_delete.append(item.id)
+                elif item is None:
+                    to_create.append(CartItem(cart=cart, product=products[product_id], quantity=quantity))
+                elif item.quantity != quantity:
+                    item.quantity = quantity
+                    to_update.append(item)
+            if serializer.validated_data['replace']:
+                to_delete.extend(item.id for product_id, item in existing.items() if product_id not in quantities)
+
+            if to_delete:
+                CartItem.objects.filter(id__in=to_delete).delete()
+            if to_update:
+                CartItem.objects.bulk_update(to_update, ['quantity'])
+            if to_create:
+                CartItem.objects.bulk_create(to_create)
+    except IntegrityError:
+        return Response({"detail": "Cart was modified concurrently, please retry."}, status=status.HTTP_409_CONFLICT)
+
+    return Response(cart_summary(request.user, compact=query_flag(request, 'compact')))
+
+def cart_with_totals(user):
+    return Cart.objects.filter(user=user).annotate(
+        item_count=Coalesce(Sum('cartitem__quantity'), 0),
+        total=Coalesce(Sum(F('cartitem__quantity') * F('cartitem__product__price'), output_field=IntegerField()), 0),
+    )
+
+def cart_lines(cart, compact=False):
+    cart_items = (
+        CartItem.objects.filter(cart=cart)
+        .select_related('product')
+        .annotate(line_total=F('quantity') * F('product__price'))
+        .order_by('id')
+    )
+    if settings.FAST_RENDERING:
+        return projections.cart_line_rows(cart_items, compact)
+    if compact:
+        cart_items = cart_items.defer('product__description')
+    return cart_items
+
+def cart_data(cart, cart_items, compact=False):
+    if settings.FAST_RENDERING:
+        items = projections.cart_lines(cart_items, compact)
+    else:
+        serializer_class = CompactCartLineSerializer if compact else CartLineSerializer
+        items = serializer_class(cart_items, many=True).data
+    return {
+        'items': items,
+        'item_count': cart.item_count,
+        'total': cart.total,
+    }
+
+def cart_summary(user, compact=False):
+    """
+    Build the cart response: items with line totals plus the item count and
+    grand total, aggregated by the database in two queries. Returns None if
+    the user has no cart.
+    """
+    cart = cart_with_totals(user).first()
+    if cart is None:
+        return None
+    return cart_data(cart, cart_lines(cart, compact), compact)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def view_cart(request):
-    user = request.user
-    try:
-        cart = Cart.objects.get(user=user)
-        cart_items = CartItem.objects.filter(cart=cart)
-        serializer = CartItemSerializer(cart_items, many=True)
-        return Response(serializer.data)
-    except Cart.DoesNotExist:
+    data = cart_summary(request.user, compact=query_flag(request, 'compact'))
+    if data is None:
         return Response({"detail": "Cart does not exist"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(data)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def place_order(request):
     user = request.user
     try:
-        cart = Cart.objects.get(user=user)
-        cart_items = CartItem.objects.filter(cart=cart)
-
-        if not cart_items.exists():
-            return Response({"detail": "Your cart is empty. Cannot place an order."}, status=status.HTTP_400_BAD_REQUEST)
-
-        total_amount = sum(item.product.price * item.quantity for item in cart_items)
-
-        order = Orders.objects.create(user=user, total_amount=total_amount)
-
-        # Create the order items data BEFORE deleting cart items
-        order_items_data = [
-            {'product_name': item.product.name, 'price': item.product.price, 'quantity': item.quantity, 'total_price': item.product.price * item.quantity}
-            for item in cart_items
-        ]
-
-        for cart_item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
+        with transaction.atomic():
+            # Lock the cart, then its lines, so two checkouts of one cart run one
+            # after the other and cart edits wait until the order is committed
+            cart = Cart.objects.select_for_update().get(user=user)
+            cart_items = list(
+                CartItem.objects.select_for_update(of=('self',)).filter(cart=cart).select_related('product')
             )
 
-        cart_items.delete()
-        
-        subject = "Order Confirmation"
-        html_message = render_to_string('order_confirmation_email.html', {
-            'user': user,
-            'order': order,
-            'order_items': order_items_data
-        })
-        plain_message = f"Thank you for your purchase, {user.username}! Your order has been placed successfully. Order ID: {order.id} Total Amount: ₹{order.total_amount}"
+            if not cart_items:
+                return Response({"detail": "Your cart is empty. Cannot place an order."}, status=status.HTTP_400_BAD_REQUEST)
+
+            total_amount = 0
+            order_items_data = []
+            for item in cart_items:
+                line_total = item.product.price * item.quantity
+                total_amount += line_total
+                order_items_data.append(
+                    {'product_name': item.product.name, 'price': item.product.price, 'quantity': item.quantity, 'total_price': line_total}
+                )
+
+            # Take stock first; a shortfall rolls back the whole order
+            inventory.reserve((item.product_id, item.quantity) for item in cart_items)
+            order = Orders.objects.create(user=user, total_amount=total_amount)
+            OrderItem.objects.bulk_create([
+                OrderItem.for_product(item.product, order=order, quantity=item.quantity)
+                for item in cart_items
+            ])
+            stats.record_order_items(
+                order, [(item.product.category, item.quantity, item.product.price * item.quantity) for item in cart_items]
+            )
+            # Only remove the rows that were ordered, not items added meanwhile
+            CartItem.objects.filter(id__in=[item.id for item in cart_items]).delete()
 
-        try:
-            send_mail(
+            subject = "Order Confirmation"
+            plain_message = f"Thank you for your purchase, {user.username}! Your order has been placed successfully. Order ID: {order.id} Total Amount: ₹{order.total_amount}"
+            queue_email(
                 subject,
                 plain_message,
-                settings.EMAIL_HOST_USER,  
                 [user.email],
-                fail_silently=False,
-                html_message=html_message
+                html_template='order_confirmation_email.html',
+                context={
+                    'user': {'username': user.username},
+                    'order': {'id': order.id, 'total_amount': order.total_amount},
+                    'order_items': order_items_data,
+                },
             )
-        except BadHeaderError:
-            return Response({"detail": "Invalid header found."}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            logger.error(f"Failed to send order confirmation email: {e}")
-
-        return Response({"detail": "Order placed successfully"}, status=status.HTTP_201_CREATED)
     except Cart.DoesNotExist:
         return Response({"detail": "Your cart does not exist."}, status=status.HTTP_400_BAD_REQUEST)
+    except InsufficientStock as e:
+        return Response(
+            {"detail": "Some items are out of stock.", "product_ids": e.product_ids},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    return Response({"detail": "Order placed successfully"}, status=status.HTTP_201_CREATED)
 
 @api_view(['POST'])
 def contact_form(request):
     """
-    Handles contact form submissions and sends an email.
+    Handles contact form submissions and queues an email.
     """
     serializer = ContactFormSerializer(data=request.data)
     if serializer.is_valid():
@@ -288,18 +455,8 @@ def contact_form(request):
         subject = f"New Contact Form Submission from {name}"
         email_body = f"Name: {name}\nEmail: {email}\nMessage: {message}"
 
-        try:
-            send_mail(
-                subject,
-                email_body,
-                settings.EMAIL_HOST_USER,
-                [settings.EMAIL_HOST_USER],
-                fail_silently=False,
-            )
-            return Response({"detail": "Message sent successfully"}, status=status.HTTP_200_OK)
-        except Exception as e:
-            logger.error(f"Failed to send contact form email: {e}")
-            return Response({"detail": "Failed to send message."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        queue_email(subject, email_body, [settings.EMAIL_HOST_USER])
+        return Response({"detail": "Message sent successfully"}, status=status.HTTP_200_OK)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -310,7 +467,11 @@ class UserOrderList(APIView):
     """
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        orders = Orders.objects.filter(user=request.user)
+        if settings.FAST_RENDERING:
+            orders = projections.order_rows(Orders.objects.filter(user=request.user))
+            items = projections.order_item_rows(OrderItem.objects.filter(order__user=request.user))
+            return Response(projections.orders(orders, items))
+        orders = OrderSerializer.setup_eager_loading(Orders.objects.filter(user=request.user))
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
     
@@ -318,12 +479,51 @@ class AllOrderList(generics.ListAPIView):
     """
     Retrieve a list of all orders for admin users, with filtering and searching.
     """
-    queryset = Orders.objects.all()
+    queryset = OrderSerializer.setup_eager_loading(Orders.objects.order_by('-created_at', '-id'))
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter] # Add filtering and search backends
-    filterset_fields = ['shipping_status', 'created_at'] # Add fields for filtering
-    search_fields = ['user__username', 'id'] # Add fields for searching
+    pagination_class = OrderPagination
+    filter_backends = [DjangoFilterBackend, OrderSearchFilter] # Add filtering and search backends
+    filterset_class = OrderFilter # Status, exact date and created/total range filters
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_RENDERING:
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(projections.order_rows(self.filter_queryset(self.get_queryset())))
+        items = projections.order_item_rows(OrderItem.objects.filter(order_id__in=[order['id'] for order in page]))
+        return self.get_paginated_response(projections.orders(page, items, request))
+
+
+class ExportView(APIView):
+    """
+    Stream every row of `queryset` matching `filterset_class` as CSV or
+    NDJSON, reading it in chunks so memory stays flat however large the
+    export is.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    kind = None
+    queryset = None
+    filterset_class = None
+
+    def get(self, request, export_format):
+        if export_format not in exports.FORMATS:
+            raise Http404
+        filterset = self.filterset_class(request.query_params, queryset=self.queryset.all())
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        return exports.export_response(self.kind, export_format, filterset.qs)
+
+class OrderExport(ExportView):
+    """Orders with their line items; takes the same filters as AllOrderList."""
+    kind = 'orders'
+    queryset = Orders.objects.all()
+    filterset_class = OrderFilter
+
+class CustomerExport(ExportView):
+    """Customers; takes the same filters as CustomerList."""
+    kind = 'customers'
+    queryset = Customer.objects.all()
+    filterset_class = CustomerFilter
 
 
 class OrderDetail(APIView):
@@ -333,7 +533,7 @@ class OrderDetail(APIView):
     permission_classes = [IsAuthenticated]
     def get_object(self, pk):
         try:
-            order = Orders.objects.get(pk=pk)
+            order = OrderSerializer.setup_eager_loading(Orders.objects.all()).get(pk=pk)
             # Ensure only the owner can view their order, or an admin
             if order.user != self.request.user and not self.request.user.is_staff:
                 raise Http404
@@ -359,13 +559,44 @@ class OrderDetail(APIView):
         order.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class AdminStats(APIView):
+    """
+    Dashboard totals: customers, orders and revenue, orders by shipping status
+    and revenue by category. Optional ?start= and ?end= (YYYY-MM-DD) limit
+    orders and revenue to a date range.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            start = parse_date_param(request, 'start')
+            end = parse_date_param(request, 'end')
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(stats.dashboard_stats(start=start, end=end))
+
+def parse_date_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format.")
+    return parsed
+
 # New Views for Admin Product and Customer Management
 class CustomerList(generics.ListAPIView):
-    queryset = Customer.objects.all()
-    serializer_class = CustomerSerializer
+    """
+    Paginated customer directory for admin users, newest first. Filters on
+    city, state and is_staff; ?search= matches the start of the username,
+    name, email or phone number.
+    """
+    queryset = Customer.objects.only(*CustomerListSerializer.Meta.fields).order_by('-id')
+    serializer_class = CustomerListSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
-    filter_backends = [filters.SearchFilter] # Add search backend
-    search_fields = ['username', 'customer_name', 'email', 'phone_number'] # Add fields for searching
+    pagination_class = CustomerPagination
+    filter_backends = [DjangoFilterBackend, CustomerSearchFilter]
+    filterset_class = CustomerFilter
 
 class ProductListCreate(generics.ListCreateAPIView):
     queryset = Product.objects.all()
@@ -374,7 +605,67 @@ class ProductListCreate(generics.ListCreateAPIView):
     filter_backends = [filters.SearchFilter] # Add search backend
     search_fields = ['name', 'description', 'category'] # Add fields for searching
 
+class ProductImport(APIView):
+    """
+    Bulk create or update products by SKU from a text/csv or
+    application/x-ndjson request body. The body is read as a stream and
+    imported in chunks; the response counts created and updated products and
+    lists the rows that were rejected and those superseded by a later row.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    parser_classes = [ProductCSVParser, ProductNDJSONParser]
+
+    def post(self, request):
+        rows = request.data
+        if isinstance(rows, dict):
+            # No body, so DRF handed back empty data instead of calling a parser
+            return Response(
+                {"detail": "Send the products as text/csv or application/x-ndjson."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(ProductImporter().run(rows).result())
+
+class ProductStockAdjust(APIView):
+    """
+    Bulk stock changes for admins. Each item either sets `stock` (null stops
+    tracking) or adds a signed `delta`. All changes apply together or not at all.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        serializer = StockAdjustmentBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items = serializer.validated_data['items']
+        products = Product.objects.in_bulk([item['product_id'] for item in items])
+        missing = sorted({item['product_id'] for item in items} - set(products))
+        if missing:
+            return Response({"detail": "Products do not exist", "product_ids": missing}, status=status.HTTP_404_NOT_FOUND)
+
+        to_set = []
+        for item in items:
+            if 'stock' in item:
+                product = products[item['product_id']]
+                product.stock = item['stock']
+                to_set.append(product)
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_update(to_set, ['stock'])
+                inventory.adjust({item['product_id']: item['delta'] for item in items if 'delta' in item})
+        except InsufficientStock as e:
+            return Response(
+                {"detail": "Stock is not tracked or would go below zero.", "product_ids": e.product_ids},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        stock = Product.objects.filter(id__in=list(products)).order_by('id').values('id', 'name', 'stock')
+        return Response(list(stock))
+
 class ProductDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
\ No newline at end of file
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def retrieve(self, request, *args, **kwargs):
+        return catalog_cache.respond(request, lambda: super(ProductDetail, self).retrieve(request, *args, **kwargs).data)
\ No newline at end of file
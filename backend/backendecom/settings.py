@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # add this
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -88,7 +89,7 @@ DATABASES = {
     'default': dj_database_url.config(
         default=os.getenv("DATABASE_URL"),
         conn_max_age=600,
-        ssl_require=True
+        ssl_require=os.environ.get('DATABASE_SSL_REQUIRE', 'True') == 'True'
     )
 }
 
@@ -112,6 +113,28 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hasher for new passwords: 'scrypt', 'argon2' (needs argon2-cffi) or
+# 'pbkdf2'. The others stay listed so older hashes still verify; they are
+# rehashed with the selected hasher when their owner next logs in, as are
+# hashes made with different PASSWORD_HASHER_PARAMS.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+_PASSWORD_HASHER_PATHS = {
+    'scrypt': 'api.hashers.ScryptPasswordHasher',
+    'argon2': 'api.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHER_PATHS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHER_PATHS.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# Costs for the tuned hashers in api/hashers.py. scrypt uses 16MB per hash;
+# argon2 follows the OWASP minimum rather than Django's 100MB default, so a
+# burst of logins does not exhaust a worker's memory.
+PASSWORD_HASHER_PARAMS = {
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    'argon2': {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1},
+}
+
 # Set AUTH_USER_MODEL to your custom Customer model
 AUTH_USER_MODEL = 'api.Customer'
 
@@ -144,6 +167,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Browser cache lifetime for uploads served by api.media.serve_media. Files
+# with a content hash in their name (image variants) are cached for a year.
+MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', '86400'))
 
 # Correct CORS configuration for production
 CORS_ALLOW_ALL_ORIGINS = False
@@ -154,14 +180,80 @@ CORS_ALLOWED_ORIGINS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
-    )
+    ),
+    # Same JSON as DRF's JSONRenderer, encoded by orjson when it is installed
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+# Keep /api/getProducts/ returning the whole catalog as a bare list for older
+# clients. Set to 'False' to serve it through the cursor-paginated catalog.
+PRODUCTS_UNPAGINATED_COMPAT = os.environ.get('PRODUCTS_UNPAGINATED_COMPAT', 'True') == 'True'
+
+# Build the getProducts/, view-cart/, user-orders/ and all-orders/ responses
+# from .values() rows with the plain-dict projections in api/projections.py
+# instead of their serializers. Set to 'False' to go through the serializers.
+FAST_RENDERING = os.environ.get('FAST_RENDERING', 'True') == 'True'
+
+# Threads per process that build resized/WebP image variants after uploads.
+# 0 builds them inline when the upload's transaction commits.
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', '2'))
+
+# Serve getProducts/, product/<pk>/, view-cart/ and user-orders/ from the async
+# views in api/async_views.py. backendecom.asgi turns this on.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# Per-route latency, SQL query count/time and render time, exported for
+# Prometheus at METRICS_PATH. Scrapes need `Authorization: Bearer
+# <METRICS_TOKEN>`; with no token set, METRICS_PATH is only served when
+# DEBUG is on and answers 404 otherwise. Requests slower than
+# METRICS_SLOW_REQUEST_MS are logged as JSON through the api.metrics logger,
+# with the SQL of their queries slower than METRICS_SLOW_QUERY_MS.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_PATH = '/metrics'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_SLOW_REQUEST_MS = float(os.environ.get('METRICS_SLOW_REQUEST_MS', '500'))
+METRICS_SLOW_QUERY_MS = float(os.environ.get('METRICS_SLOW_QUERY_MS', '100'))
+
+# Set REDIS_URL to share CACHES['default'] between workers and management
+# commands, which the catalog version and cached users rely on to see each
+# other's changes. Without it every process has its own cache.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+# Cache for rendered product list/detail responses. The default keeps entries
+# in each worker and the catalog version in CACHES['default'], so product
+# writes anywhere invalidate every worker when that cache is shared. Use
+# 'api.cache.DjangoCacheBackend' with {'alias': 'default'} to share the
+# entries too. Entries expire after CATALOG_CACHE_TIMEOUT seconds either way.
+CATALOG_CACHE = {
+    'BACKEND': os.environ.get('CATALOG_CACHE_BACKEND', 'api.cache.LRUCacheBackend'),
+    'OPTIONS': {},
+}
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', '300'))
+
+# Users behind a JWT are cached in CACHES[AUTH_USER_CACHE_ALIAS] for this many
+# seconds. Saving a Customer invalidates its entry; with a per-process cache
+# other workers may serve the old copy until it expires.
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', '60'))
+
+# last_login is written by a background thread in each worker every this many
+# seconds, one UPDATE per batch of logins. 0 writes it during the login.
+LAST_LOGIN_FLUSH_INTERVAL = float(os.environ.get('LAST_LOGIN_FLUSH_INTERVAL', '10'))
+
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
@@ -172,9 +264,19 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
 }
+# Each worker keeps the blacklisted refresh-token JTIs in memory and picks up
+# tokens blacklisted elsewhere at most this many seconds later.
+TOKEN_BLACKLIST_SYNC_INTERVAL = 5
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
-EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
\ No newline at end of file
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
+
+# Outbound emails are queued in the database and sent by
+# `manage.py send_queued_mail`. Failed sends are retried after
+# EMAIL_OUTBOX_RETRY_DELAY seconds, doubling on every attempt.
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 30
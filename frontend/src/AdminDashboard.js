@@ -12,8 +12,12 @@ import { faRupeeSign } from "@fortawesome/free-solid-svg-icons";
 
 const AdminDashboard = () => {
   const [customers, setCustomers] = useState([]);
+  // count/next/previous of the current customers page
+  const [customerPage, setCustomerPage] = useState({ count: 0, next: null, previous: null });
   const [products, setProducts] = useState([]);
   const [orders, setOrders] = useState([]);
+  // count/next/previous of the current orders page
+  const [orderPage, setOrderPage] = useState({ count: 0, next: null, previous: null });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -68,6 +72,40 @@ const AdminDashboard = () => {
     setOrderModal(!orderModal);
   };
 
+  const setCustomerResults = (data) => {
+    setCustomers(data.results);
+    setCustomerPage({ count: data.count, next: data.next, previous: data.previous });
+  };
+
+  // Loads the page at a `next`/`previous` URL from the customers endpoint
+  const fetchCustomerPage = async (url) => {
+    const token = localStorage.getItem('access_token');
+    try {
+      const response = await axios.get(url, { headers: { Authorization: `Bearer ${token}` } });
+      setCustomerResults(response.data);
+    } catch (err) {
+      console.error('Error fetching customers:', err);
+      setError('Failed to fetch customers. Please check console for details.');
+    }
+  };
+
+  const setOrderResults = (data) => {
+    setOrders(data.results);
+    setOrderPage({ count: data.count, next: data.next, previous: data.previous });
+  };
+
+  // Loads the page at a `next`/`previous` URL from the all-orders endpoint
+  const fetchOrderPage = async (url) => {
+    const token = localStorage.getItem('access_token');
+    try {
+      const response = await axios.get(url, { headers: { Authorization: `Bearer ${token}` } });
+      setOrderResults(response.data);
+    } catch (err) {
+      console.error('Error fetching orders:', err);
+      setError('Failed to fetch orders. Please check console for details.');
+    }
+  };
+
   const fetchAllData = async (customerSearch, productSearch, orderSearch, orderStatus, orderDate) => {
     setLoading(true);
     setError(null);
@@ -79,54 +117,27 @@ const AdminDashboard = () => {
     }
 
     try {
-      const [customersRes, productsRes, ordersRes] = await Promise.all([
+      const [customersRes, productsRes, ordersRes, statsRes] = await Promise.all([
         axios.get(`${process.env.REACT_APP_API_URL}/api/customers/?search=${customerSearch}`, { headers: { Authorization: `Bearer ${token}` } }),
         axios.get(`${process.env.REACT_APP_API_URL}/api/products/?search=${productSearch}`, { headers: { Authorization: `Bearer ${token}` } }),
         axios.get(`${process.env.REACT_APP_API_URL}/api/all-orders/?search=${orderSearch}&shipping_status=${orderStatus}&created_at=${orderDate}`, { headers: { Authorization: `Bearer ${token}` } }),
+        axios.get(`${process.env.REACT_APP_API_URL}/api/admin/stats/`, { headers: { Authorization: `Bearer ${token}` } }),
       ]);
-      setCustomers(customersRes.data);
+      setCustomerResults(customersRes.data);
       setProducts(productsRes.data);
-      setOrders(ordersRes.data);
-
-      // Calculate statistics
-      const totalCustomers = customersRes.data.length;
-      const totalOrders = ordersRes.data.length;
-      const totalRevenue = ordersRes.data.reduce((sum, order) => sum + parseFloat(order.total_amount), 0);
+      setOrderResults(ordersRes.data);
 
+      // Statistics and chart data are aggregated by the server
       setStats({
-        totalCustomers,
-        totalOrders,
-        totalRevenue
+        totalCustomers: statsRes.data.total_customers,
+        totalOrders: statsRes.data.total_orders,
+        totalRevenue: parseFloat(statsRes.data.total_revenue)
       });
-
-      // Prepare data for charts
-      const revenueData = productsRes.data.reduce((acc, product) => {
-        if (!acc[product.category]) {
-          acc[product.category] = 0;
-        }
-        acc[product.category] += product.price;
-        return acc;
-      }, {});
-
-      const formattedRevenueData = Object.keys(revenueData).map(key => ({
-        name: key,
-        revenue: revenueData[key]
-      }));
-      setRevenueByCategory(formattedRevenueData);
-      
-      const statusData = ordersRes.data.reduce((acc, order) => {
-        if (!acc[order.shipping_status]) {
-          acc[order.shipping_status] = 0;
-        }
-        acc[order.shipping_status] += 1;
-        return acc;
-      }, {});
-
-      const formattedStatusData = Object.keys(statusData).map(key => ({
-        name: key,
-        value: statusData[key]
-      }));
-      setOrdersByStatus(formattedStatusData);
+      setRevenueByCategory(statsRes.data.revenue_by_category.map(row => ({
+        name: row.name,
+        revenue: parseFloat(row.revenue)
+      })));
+      setOrdersByStatus(statsRes.data.orders_by_status);
 
     } catch (err) {
       console.error('Error fetching admin data:', err);
@@ -370,6 +381,26 @@ const AdminDashboard = () => {
                 ))}
               </tbody>
             </Table>
+            <div className="d-flex justify-content-between align-items-center">
+              <span>{customerPage.count} customers</span>
+              <div>
+                <Button
+                  color="secondary"
+                  className="me-2"
+                  disabled={!customerPage.previous}
+                  onClick={() => fetchCustomerPage(customerPage.previous)}
+                >
+                  Previous
+                </Button>
+                <Button
+                  color="secondary"
+                  disabled={!customerPage.next}
+                  onClick={() => fetchCustomerPage(customerPage.next)}
+                >
+                  Next
+                </Button>
+              </div>
+            </div>
           </CardBody>
         </Card>
 
@@ -487,6 +518,26 @@ const AdminDashboard = () => {
                 ))}
               </tbody>
             </Table>
+            <div className="d-flex justify-content-between align-items-center">
+              <span>{orderPage.count} orders</span>
+              <div>
+                <Button
+                  color="secondary"
+                  className="me-2"
+                  disabled={!orderPage.previous}
+                  onClick={() => fetchOrderPage(orderPage.previous)}
+                >
+                  Previous
+                </Button>
+                <Button
+                  color="secondary"
+                  disabled={!orderPage.next}
+                  onClick={() => fetchOrderPage(orderPage.next)}
+                >
+                  Next
+                </Button>
+              </div>
+            </div>
           </CardBody>
         </Card>
       </Container>
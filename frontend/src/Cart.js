@@ -34,12 +34,8 @@ const Cart = () => {
           Authorization: `Bearer ${accessToken}`,
         },
       });
-      setCartItems(response.data);
-      
-      const calculatedTotalPrice = response.data.reduce(
-        (total, item) => total + item.product.price * item.quantity, 0
-      );
-      setTotalPrice(calculatedTotalPrice);
+      setCartItems(response.data.items);
+      setTotalPrice(response.data.total);
       setLoading(false);
     } catch (error) {
       console.error('Error fetching cart items', error);